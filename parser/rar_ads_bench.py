@@ -0,0 +1,138 @@
+import argparse
+import io
+import json
+import sys
+import time
+import timeit
+
+from rar_ads_extractor import open_archive, parse_extra_area, parse_rar5, vd, ve, write_synthetic_rar5
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def synthetic_archive(count, data_size=64):
+    """Build an in-memory RAR5 with `count` STM service headers carrying stream names."""
+    out = io.BytesIO()
+    write_synthetic_rar5(out, files=1, services=count, data_size=data_size)
+    return out.getvalue()
+
+
+def best(fn, number, repeat=5):
+    """Best-of-`repeat` seconds per call; the minimum is the least noisy estimate."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def bench_vd(number):
+    buf = b''.join(ve(v) for v in (0, 3, 0x7F, 0x80, 0x3FFF, 1 << 20, 1 << 35))
+    offsets = []
+    offset = 0
+    while offset < len(buf):
+        offsets.append(offset)
+        offset = vd(buf, offset)[1]
+
+    def run():
+        for offset in offsets:
+            vd(buf, offset)
+    return best(run, number) / len(offsets)
+
+
+def bench_extra_area(number):
+    rec = ve(7) + b':..\\..\\..\\Users\\Public\\evil.bat'
+    htime = ve(3) + ve(0x02) + b'\x00' * 8
+    area = ve(len(rec)) + rec + ve(len(htime)) + htime
+    return best(lambda: parse_extra_area(area, 0, len(area)), number)
+
+
+def bench_parse(raw, number):
+    return best(lambda: sum(1 for _ in parse_rar5(raw)), number)
+
+
+def bench_file(path):
+    """Walk an on-disk archive through the mmap path, return throughput and peak RSS."""
+    start = time.perf_counter()
+    with open_archive(path) as (_src, raw):
+        count = sum(1 for _ in parse_rar5(raw))
+        size = len(raw)
+    elapsed = time.perf_counter() - start
+    results = {
+        'file_headers': count,
+        'file_parse_s': elapsed,
+        'file_headers_per_s': count / elapsed,
+        'file_archive_mb': size / 1e6,
+    }
+    if resource is not None:
+        results['file_max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def run_all(entries, number):
+    raw = synthetic_archive(entries)
+    parse = bench_parse(raw, max(1, number // 1000))
+    return {
+        'vd_ns': bench_vd(number) * 1e9,
+        'parse_extra_area_us': bench_extra_area(number) * 1e6,
+        'parse_rar5_ms': parse * 1e3,
+        'parse_rar5_headers_per_s': (entries + 2) / parse,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the rar_ads_extractor header parser")
+    parser.add_argument('-n', '--entries', type=int, default=100_000, help="STM headers in the synthetic archive")
+    parser.add_argument('--number', type=int, default=10_000, help="Iterations for the micro-benchmarks")
+    parser.add_argument('-i', '--input', default=None, help="Also time parsing this archive from disk and report peak RSS")
+    parser.add_argument('-g', '--generate', default=None, metavar='OUT', help="Write a synthetic RAR5 corpus file and exit")
+    parser.add_argument('--files', type=int, default=1, help="FILE headers for --generate")
+    parser.add_argument('--data-size', type=int, default=64, help="Data area bytes per entry for --generate")
+    parser.add_argument('--sparse', action='store_true', help="Leave data areas as sparse holes for --generate")
+    parser.add_argument('--seed', type=int, default=0, help="Data pattern seed for --generate")
+    parser.add_argument('--save', default=None, help="Write results as JSON baseline")
+    parser.add_argument('--compare', default=None, help="Compare against a JSON baseline, exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown vs baseline (default: 0.25)")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.generate:
+        start = time.perf_counter()
+        with open(args.generate, 'wb') as f:
+            count = write_synthetic_rar5(f, files=args.files, services=args.entries,
+                                         data_size=args.data_size, seed=args.seed, sparse=args.sparse)
+            size = f.tell()
+        print(f"[+] Wrote {args.generate}: {count} entries, {size} bytes "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    results = run_all(args.entries, args.number)
+    if args.input:
+        results.update(bench_file(args.input))
+    for key, value in results.items():
+        print(f"{key:28s} {value:,.2f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = False
+        for key, value in results.items():
+            if key not in baseline:
+                continue
+            # throughput keys regress when they drop, timings when they grow
+            change = baseline[key] / value - 1 if key.endswith('_per_s') else value / baseline[key] - 1
+            flag = "REGRESSION" if change > args.tolerance else ""
+            regressed |= bool(flag)
+            print(f"{key:28s} {change:+.1%} {flag}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
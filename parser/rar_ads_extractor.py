@@ -1,9 +1,29 @@
 import argparse
 import binascii
+import errno
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import random
 import re
 import struct
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
 
+RAR5_SIGNATURE = b'Rar!\x1a\x07\x01\x00'
+COPY_CHUNK = 8 << 20
+INDEX_VERSION = 6
+SCAN_BATCH = 4096  # paths handed to the --scan pool at a time
+SPLIT_BEFORE = 0x08  # header flag: data area continues from the previous volume
+SPLIT_AFTER = 0x10   # header flag: data area continues in the next volume
+VOLUME_RE = re.compile(r'^(.*\.part)(\d+)(\.rar)$', re.I)
 
 def ve(v):
     """Encode integer as RAR5 variable-length integer."""
@@ -21,8 +41,12 @@ def ve(v):
 
 def vd(data, offset):
     """Decode RAR5 vint at offset, return (value, new_offset)."""
-    val = 0
-    shift = 0
+    b = data[offset]
+    if b < 0x80:  # most header fields (types, flags, short sizes) fit in one byte
+        return b, offset + 1
+    val = b & 0x7F
+    shift = 7
+    offset += 1
     while True:
         b = data[offset]
         val |= (b & 0x7F) << shift
@@ -53,21 +77,42 @@ def parse_extra_area(raw, offset, size):
     return records
 
 
-@dataclass
+@dataclass(slots=True)
 class Entry:
     type: int
-    name: str
+    name_raw: bytes
     data_offset: int
     data_size: int
     unpack_size: int
     data_crc: int
     comp_info: int
-    stream_name: str
+    stream_raw: bytes
+    flags: int = 0
+    segments: tuple = ()  # (volume, offset, size) pieces when not plain volume 0 data
+    file_flags: int = 0
+
+    @property
+    def has_crc(self):
+        """False when the header carries no CRC32, e.g. archives hashed with BLAKE2 (rar -htb)"""
+        return bool(self.file_flags & 0x04)
+
+    # Names stay as raw bytes until something prints or uses them.
+    @property
+    def name(self):
+        return self.name_raw.decode('utf-8', errors='replace')
+
+    @property
+    def stream_name(self):
+        return self.stream_raw.decode('utf-8', errors='replace')
 
 
 def parse_rar5(raw):
-    """Parse all RAR5 headers and yield Entry objects."""
-    assert raw[:8] == b'Rar!\x1a\x07\x01\x00', "Not a RAR5 archive"
+    """Parse all RAR5 headers and yield Entry objects.
+
+    `raw` may be bytes, an mmap or a memoryview; only header bytes are read,
+    data areas are skipped by offset.
+    """
+    assert raw[:8] == RAR5_SIGNATURE, "Not a RAR5 archive"
     pos = 8
 
     while pos < len(raw):
@@ -90,11 +135,12 @@ def parse_rar5(raw):
         if hdr_type == 5:
             break
 
-        name = ""
+        name_raw = b""
         unpack_size = 0
         data_crc = 0
+        file_flags = 0
         comp_info = 0
-        stream_name = ""
+        stream_raw = b""
 
         if hdr_type in (2, 3):
             file_flags, p = vd(raw, p)
@@ -108,29 +154,305 @@ def parse_rar5(raw):
             comp_info, p = vd(raw, p)
             _host_os, p = vd(raw, p)
             name_len, p = vd(raw, p)
-            name = raw[p:p + name_len].decode('utf-8', errors='replace')
+            name_raw = raw[p:p + name_len]
             p += name_len
 
             if extra_size > 0:
                 extra_records = parse_extra_area(raw, body_end - extra_size, extra_size)
                 if 7 in extra_records:
-                    sn = extra_records[7].rstrip(b'\x00').decode('utf-8', errors='replace')
-                    stream_name = sn
+                    stream_raw = extra_records[7].rstrip(b'\x00')
 
         data_offset = body_end
         yield Entry(
             type=hdr_type,
-            name=name,
+            name_raw=name_raw,
             data_offset=data_offset,
             data_size=data_size,
             unpack_size=unpack_size,
             data_crc=data_crc,
             comp_info=comp_info,
-            stream_name=stream_name,
+            stream_raw=stream_raw,
+            flags=hdr_flags,
+            file_flags=file_flags,
         )
         pos = body_end + data_size
 
 
+@contextmanager
+def open_archive(path):
+    """Map the archive read-only so walking headers only pages in header bytes.
+
+    Yields (file, raw); the file is kept open for descriptor-level copies.
+    """
+    with open(path, 'rb') as f:
+        try:
+            raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file, nothing to map
+            yield f, b''
+            return
+        with raw:
+            yield f, raw
+
+
+def volume_paths(path):
+    """Every volume of a .partN.rar set from part 1 on, or just [path]."""
+    m = VOLUME_RE.match(path)
+    if not m:
+        return [path]
+    prefix, number, suffix = m.groups()
+    paths = []
+    while os.path.exists(part := f"{prefix}{len(paths) + 1:0{len(number)}d}{suffix}"):
+        paths.append(part)
+    return paths or [path]
+
+
+@contextmanager
+def open_volumes(path):
+    """open_archive every volume of path's set, yield [(file, raw)] in volume order."""
+    with ExitStack() as stack:
+        yield [stack.enter_context(open_archive(part)) for part in volume_paths(path)]
+
+
+def parse_volumes(volumes):
+    """Yield entries across all volumes, merging split data areas into one Entry.
+
+    A merged entry lists each (volume, offset, size) piece in segments and
+    takes data_crc from its last part, which holds the CRC of the whole file.
+    """
+    pending = None
+    for vol, (_src, raw) in enumerate(volumes):
+        for entry in parse_rar5(raw):
+            if vol and entry.type == 1:
+                continue  # each volume repeats the main header
+            piece = (vol, entry.data_offset, entry.data_size)
+            if entry.flags & SPLIT_BEFORE and pending is not None:
+                pending.segments += (piece,)
+                pending.data_size += entry.data_size
+                pending.data_crc = entry.data_crc
+                pending.file_flags = entry.file_flags
+                pending.flags = (pending.flags & ~SPLIT_AFTER) | (entry.flags & SPLIT_AFTER)
+                if entry.flags & SPLIT_AFTER:
+                    continue
+                entry, pending = pending, None
+            elif entry.flags & SPLIT_AFTER:
+                entry.segments = (piece,)
+                pending = entry
+                continue
+            elif vol:
+                entry.segments = (piece,)
+            yield entry
+    if pending is not None:
+        yield pending  # later volumes missing, keep what we have
+
+
+def data_segments(entry):
+    return entry.segments or ((0, entry.data_offset, entry.data_size),)
+
+
+def check_segments(volumes, entry):
+    """Raise ValueError if entry's data area is incomplete: a piece runs past the end of
+    its volume, or it continues into a volume that is missing."""
+    if entry.flags & SPLIT_AFTER:
+        raise ValueError("Data area continues in a later volume that is missing")
+    for vol, offset, size in data_segments(entry):
+        length = len(volumes[vol][1])
+        if offset + size > length:
+            where = f" of volume {vol + 1}" if len(volumes) > 1 else ""
+            raise ValueError(f"Data area {offset}+{size} runs past end{where} ({length} bytes), archive is truncated")
+
+
+def copy_range(src, raw, dst, offset, size):
+    """Copy raw[offset:offset + size] into dst at its current position.
+
+    Tries copy_file_range, then sendfile, between the two descriptors so the
+    data never passes through Python; falls back to chunked memoryview writes
+    straight off the map.
+    """
+    end = offset + size
+    if end > len(raw):
+        raise ValueError(f"Data area {offset}+{size} runs past end of archive ({len(raw)} bytes)")
+
+    dst.flush()
+    for kernel_copy in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, kernel_copy):
+            continue
+        try:
+            while offset < end:
+                n = min(end - offset, COPY_CHUNK)
+                if kernel_copy == 'copy_file_range':
+                    sent = os.copy_file_range(src.fileno(), dst.fileno(), n, offset)
+                else:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, n)
+                if not sent:
+                    break
+                offset += sent
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                raise
+        if offset >= end:
+            return
+
+    with memoryview(raw) as view:
+        while offset < end:
+            n = min(end - offset, COPY_CHUNK)
+            dst.write(view[offset:offset + n])
+            offset += n
+
+
+def cache_dir():
+    base = (os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'rar_ads_extractor')
+
+
+def index_key(volumes):
+    """Identity of the archive as indexed: per volume, size, mtime and a hash of its first and last 64 KiB."""
+    parts = []
+    for src, raw in volumes:
+        st = os.fstat(src.fileno())
+        head_hash = hashlib.blake2b(raw[:1 << 16] + raw[-(1 << 16):], digest_size=16).hexdigest()
+        parts.append([st.st_size, st.st_mtime_ns, head_hash])
+    return {'version': INDEX_VERSION, 'byteorder': sys.byteorder, 'volumes': parts}
+
+
+def index_path(path):
+    name = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(cache_dir(), f"{name}.idx")
+
+
+class IndexTable:
+    """Entries as flat columns: one unsigned 64-bit array per numeric field,
+    name and stream bytes concatenated into one blob, segments flattened.
+
+    Serialised as a count header followed by each column's raw bytes, so a
+    cached index loads with one read() and a frombytes() per column instead
+    of decoding a row per entry.
+    """
+
+    NUMERIC = ('type', 'data_offset', 'data_size', 'unpack_size', 'data_crc', 'comp_info', 'flags', 'file_flags',
+               'name_len', 'stream_len', 'segment_count')
+    HEADER = struct.Struct('<3Q')  # entries, segment triples, blob bytes
+
+    def __init__(self):
+        self.columns = {name: array('Q') for name in self.NUMERIC}
+        self.segments = array('Q')
+        self.blob = bytearray()
+
+    def append(self, entry):
+        c = self.columns
+        for name in ('type', 'data_offset', 'data_size', 'unpack_size', 'data_crc', 'comp_info', 'flags',
+                     'file_flags'):
+            c[name].append(getattr(entry, name))
+        c['name_len'].append(len(entry.name_raw))
+        c['stream_len'].append(len(entry.stream_raw))
+        c['segment_count'].append(len(entry.segments))
+        for segment in entry.segments:
+            self.segments.extend(segment)
+        self.blob += entry.name_raw
+        self.blob += entry.stream_raw
+
+    def __len__(self):
+        return len(self.columns['type'])
+
+    def write(self, f):
+        f.write(self.HEADER.pack(len(self), len(self.segments) // 3, len(self.blob)))
+        for name in self.NUMERIC:
+            self.columns[name].tofile(f)
+        self.segments.tofile(f)
+        f.write(self.blob)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Raises ValueError unless data is exactly one complete table."""
+        table = cls()
+        if len(data) < cls.HEADER.size:
+            raise ValueError("index header truncated")
+        count, segments, blob = cls.HEADER.unpack_from(data)
+        width = table.segments.itemsize
+        expected = cls.HEADER.size + (len(cls.NUMERIC) * count + 3 * segments) * width + blob
+        if len(data) != expected:
+            raise ValueError(f"index is {len(data)} bytes, expected {expected}")
+        view = memoryview(data)
+        pos = cls.HEADER.size
+        for name in cls.NUMERIC:
+            table.columns[name].frombytes(view[pos:pos + count * width])
+            pos += count * width
+        table.segments.frombytes(view[pos:pos + 3 * segments * width])
+        pos += 3 * segments * width
+        table.blob = view[pos:]
+        c = table.columns
+        if (sum(c['name_len']) + sum(c['stream_len']) != blob
+                or sum(c['segment_count']) != segments):
+            raise ValueError("index columns disagree with its header")
+        return table
+
+    def __iter__(self):
+        c = self.columns
+        blob, segments = bytes(self.blob), self.segments
+        pos = seg = 0
+        for (htype, data_offset, data_size, unpack_size, data_crc, comp_info, flags, file_flags,
+             name_len, stream_len, segment_count) in zip(*(c[name] for name in self.NUMERIC)):
+            name_end = pos + name_len
+            stream_end = name_end + stream_len
+            pieces = ()
+            if segment_count:
+                pieces = tuple(tuple(segments[i:i + 3]) for i in range(seg, seg + 3 * segment_count, 3))
+                seg += 3 * segment_count
+            yield Entry(htype, blob[pos:name_end], data_offset, data_size, unpack_size, data_crc, comp_info,
+                        blob[name_end:stream_end], flags, pieces, file_flags)
+            pos = stream_end
+
+
+def read_index(cache_file, key):
+    """The cached IndexTable if cache_file holds a complete index for key, else None."""
+    try:
+        with open(cache_file, 'rb') as f:
+            if json.loads(f.readline()) != key:
+                return None
+            return IndexTable.from_bytes(f.read())
+    except (OSError, ValueError):
+        return None  # missing, stale or corrupt index: reparse
+
+
+def iter_entries(path, volumes, use_cache=True):
+    """Yield Entry objects, from the user-cache index when it still matches the file.
+
+    The index is the key as a JSON line followed by an IndexTable. It is
+    read and checked whole before the first entry is yielded, so a corrupt
+    index just means a reparse. A fresh parse is collected into a table
+    alongside the walk and only replaces the old index if the walk runs to
+    completion.
+    """
+    if not use_cache:
+        yield from parse_volumes(volumes)
+        return
+
+    key = index_key(volumes)
+    cache_file = index_path(path)
+    table = read_index(cache_file, key)
+    if table is not None:
+        yield from table
+        return
+
+    table = IndexTable()
+    for entry in parse_volumes(volumes):
+        table.append(entry)
+        yield entry
+
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        with open(tmp, 'wb') as out:
+            out.write(json.dumps(key).encode() + b"\n")
+            table.write(out)
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass  # read-only cache location, carry on uncached
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
 def filename_from_stream(stream_name):
     r"""Extract a safe filename from an ADS stream path like ':..\..\..\path\to\file.bat'."""
     cleaned = stream_name.lstrip(':')
@@ -143,67 +465,362 @@ def default_filename(entry):
     if entry.stream_name:
         return filename_from_stream(entry.stream_name)
     if entry.name and entry.type == 2:
-        return entry.name
+        # FILE names are as hostile as stream names: 'sub/x' or '../x' must not leave the output directory
+        return filename_from_stream(entry.name)
     return "extracted.bin"
 
 
-def build_single_file_rar(raw, entry, filename):
-    cd = raw[entry.data_offset:entry.data_offset + entry.data_size]
-    fname = filename.encode("utf-8")
+def unique_filename(filename, taken, directory='.'):
+    """Return filename, or filename with a _N suffix if already used in this run or on disk."""
+    stem, ext = os.path.splitext(filename)
+    candidate, n = filename, 0
+    while candidate in taken or os.path.exists(os.path.join(directory, f"{candidate}.rar")):
+        n += 1
+        candidate = f"{stem}_{n}{ext}"
+    taken.add(candidate)
+    return candidate
+
+
+def extra_record(rec_type, data):
+    """Encode one extra area record: size, type, data."""
+    rec = ve(rec_type) + data
+    return ve(len(rec)) + rec
+
+
+def file_header(htype, name, data_size, unpack_size, data_crc, comp_info=0, extra=b''):
+    """Encode a FILE (2) or SERVICE (3) header with a data area and optional extra area.
+
+    A data_crc of None leaves the CRC32 field out.
+    """
+    fname = name.encode("utf-8")
+    crc = struct.pack("<I", data_crc) if data_crc is not None else b''
     body = (
-        ve(2)                               +  # type: file header
-        ve(0x02)                            +  # flags: data area present
-        ve(len(cd))                         +  # data size
-        ve(0x04)                            +  # file flags: CRC32 present
-        ve(entry.unpack_size)               +  # unpacked size
+        ve(htype)                           +  # type: file/service header
+        ve(0x02 | (0x01 if extra else 0))   +  # flags: data area (+ extra area) present
+        (ve(len(extra)) if extra else b'')  +  # extra area size
+        ve(data_size)                       +  # data size
+        ve(0x04 if crc else 0)              +  # file flags: CRC32 present
+        ve(unpack_size)                     +  # unpacked size
         ve(0x20)                            +  # attributes
-        struct.pack("<I", entry.data_crc)   +  # data CRC32
-        ve(entry.comp_info)                 +  # compression info
+        crc                                 +  # data CRC32
+        ve(comp_info)                       +  # compression info
         ve(0)                               +  # host OS
         ve(len(fname))                      +  # name length
-        fname                                  # file name
+        fname                               +  # file name
+        extra                                  # extra area
     )
-    fhdr = hdr(ve(len(body)) + body)
+    return hdr(ve(len(body)) + body)
+
+
+def single_file_headers(raw, entry, filename):
+    """Return the (head, tail) bytes that wrap entry's data area in a standalone RAR5."""
+    data_crc = entry.data_crc if entry.has_crc else None
+    fhdr = file_header(2, filename, entry.data_size, entry.unpack_size, data_crc, entry.comp_info)
     eoa = hdr(ve(2) + ve(5) + ve(0))
-    return raw[:24] + fhdr + cd + eoa
+    return raw[:24] + fhdr, eoa
+
+
+def build_single_file_rar(raw, entry, filename):
+    head, tail = single_file_headers(raw, entry, filename)
+    cd = raw[entry.data_offset:entry.data_offset + entry.data_size]
+    return head + cd + tail
+
+
+def write_single_file_rar(volumes, entry, filename, dst):
+    """Stream a standalone RAR5 for entry into dst, return the number of bytes written.
+
+    Split data areas are copied piece by piece from each volume in turn.
+    A truncated data area raises ValueError before anything is written.
+    """
+    check_segments(volumes, entry)
+    # a volume's own main header carries the volume flag, so multi-volume
+    # output gets a fresh one instead
+    prefix = volumes[0][1] if len(volumes) == 1 else RAR5_SIGNATURE + SYNTHETIC_MAIN
+    head, tail = single_file_headers(prefix, entry, filename)
+    dst.write(head)
+    for vol, offset, size in data_segments(entry):
+        src, raw = volumes[vol]
+        copy_range(src, raw, dst, offset, size)
+    dst.write(tail)
+    return len(head) + entry.data_size + len(tail)
+
+
+# Main header with archive flags stored as a padded 9-byte vint, so that
+# signature + main header is exactly the 24 bytes single_file_headers copies.
+SYNTHETIC_MAIN = hdr(ve(11) + ve(1) + ve(0) + b'\x80' * 8 + b'\x00')
+
+
+def write_data_area(dst, size, block, sparse=False):
+    """Write `size` bytes cycling `block` (or seek over a hole), return their CRC32."""
+    crc = 0
+    view = memoryview(block)
+    while size:
+        chunk = view[:min(size, len(view))]
+        crc = binascii.crc32(chunk, crc)
+        if sparse:
+            dst.seek(len(chunk), os.SEEK_CUR)
+        else:
+            dst.write(chunk)
+        size -= len(chunk)
+    return crc
+
+
+def write_synthetic_rar5(dst, files=1, services=0, data_size=0, seed=0, sparse=False,
+                         stream_fmt=':..\\..\\..\\Users\\Public\\stream{}.bat'):
+    """Write a stored-method RAR5 with FILE headers each followed by their share of STM services.
+
+    Data areas are `data_size` bytes of a seeded pattern (zeros in a sparse hole
+    with `sparse`) written in chunks, so multi-GB archives never sit in memory.
+    Headers are written with a CRC placeholder and patched once the data CRC
+    is known, so `dst` must be seekable. Returns the number of entries written.
+    """
+    if sparse:
+        block = bytes(min(data_size, COPY_CHUNK))
+    else:
+        block = random.Random(seed).randbytes(min(data_size, COPY_CHUNK))
+    mtime = extra_record(3, ve(0x03) + struct.pack('<I', 0))  # htime: unix format, mtime
+
+    def entry(htype, name, extra):
+        header_pos = dst.tell()
+        dst.write(file_header(htype, name, data_size, data_size, 0, extra=extra))
+        crc = write_data_area(dst, data_size, block, sparse)
+        end = dst.tell()
+        dst.seek(header_pos)
+        dst.write(file_header(htype, name, data_size, data_size, crc, extra=extra))
+        dst.seek(end)
+
+    dst.write(RAR5_SIGNATURE + SYNTHETIC_MAIN)
+    written = streams = 0
+    hosts = max(files, 1 if services else 0)
+    for i in range(hosts):
+        if i < files:
+            entry(2, f"file{i}.txt", mtime)
+            written += 1
+        for _ in range(services * (i + 1) // hosts - services * i // hosts):
+            entry(3, 'STM', extra_record(7, stream_fmt.format(streams).encode('utf-8')))
+            written += 1
+            streams += 1
+    dst.write(hdr(ve(2) + ve(5) + ve(0)))
+    return written
 
 
 def select_target(parser, entries, index):
     if index is not None:
-        if index < 0 or index >= len(entries):
-            parser.error(f"Index {index} out of range (0-{len(entries)-1})")
-        target = entries[index]
+        count = 0
+        target = None
+        for count, entry in enumerate(entries, 1):
+            if count - 1 == index:
+                target = entry
+                break
+        if target is None:
+            parser.error(f"Index {index} out of range (0-{count-1})")
         if target.data_size == 0:
             parser.error(f"Entry [{index}] has no data area")
         return target
 
-    stm = [entry for entry in entries if entry.type == 3 and entry.data_size > 0]
-    if not stm:
+    stm = next((entry for entry in entries if entry.type == 3 and entry.data_size > 0), None)
+    if stm is None:
         parser.error("No STM service headers with data found. Use -l to inspect.")
-    return stm[0]
+    return stm
 
 
-def print_entries(path, raw, entries):
-    type_names = {1: 'MAIN', 2: 'FILE', 3: 'SERVICE', 4: 'CRYPT', 5: 'END'}
-    print(f"[+] {path} ({len(raw)} bytes) — {len(entries)} entries\n")
+def extract_all(volumes, entries, directory, jobs=None):
+    """Rebuild a standalone RAR5 for every FILE/STM entry with data, writing concurrently.
+
+    Returns [(index, entry, out_path, out_size, error)] in entry order. An
+    entry that fails has out_size None and the reason in error; its partial
+    output is removed and the other entries are still written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    taken = set()
+    plan = []
     for index, entry in enumerate(entries):
+        if entry.type not in (2, 3) or entry.data_size == 0:
+            continue
+        filename = unique_filename(default_filename(entry), taken, directory)
+        plan.append((index, entry, filename, os.path.join(directory, f"{filename}.rar")))
+
+    def write(job):
+        index, entry, filename, out_rar = job
+        try:
+            with open(out_rar, 'wb') as f:
+                return index, entry, out_rar, write_single_file_rar(volumes, entry, filename, f), None
+        except (OSError, ValueError) as e:
+            if os.path.exists(out_rar):
+                os.remove(out_rar)
+            return index, entry, out_rar, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(write, plan))
+
+
+def is_stored(entry):
+    """Compression method (comp_info bits 7-9) 0 means the data area is the file itself."""
+    return (entry.comp_info >> 7) & 0x07 == 0
+
+
+def crc_range(raw, offset, size, crc=0):
+    """CRC32 of raw[offset:offset + size] in COPY_CHUNK pieces; zlib drops the GIL per chunk."""
+    end = offset + size
+    with memoryview(raw) as view:
+        for start in range(offset, end, COPY_CHUNK):
+            crc = zlib.crc32(view[start:min(start + COPY_CHUNK, end)], crc)
+    return crc
+
+
+def verify_entries(volumes, entries, jobs=None):
+    """CRC every data area in a thread pool.
+
+    Stored entries are checked against data_crc; for compressed ones data_crc
+    covers the unpacked file, so only the packed CRC is reported. Entries
+    whose header has no CRC32 are NOCRC and not hashed.
+    Returns [(index, entry, crc, status, seconds)] in entry order.
+    """
+    def check(item):
+        index, entry = item
+        pieces = data_segments(entry)
+        if entry.flags & SPLIT_AFTER or any(offset + size > len(volumes[vol][1]) for vol, offset, size in pieces):
+            return index, entry, None, 'TRUNCATED', 0.0
+        if not entry.has_crc:
+            return index, entry, None, 'NOCRC', 0.0
+        start = time.perf_counter()
+        crc = 0
+        for vol, offset, size in pieces:
+            crc = crc_range(volumes[vol][1], offset, size, crc)
+        elapsed = time.perf_counter() - start
+        if not is_stored(entry):
+            status = 'PACKED'
+        elif crc == entry.data_crc:
+            status = 'OK'
+        else:
+            status = 'BAD'
+        return index, entry, crc, status, elapsed
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(check, entries))
+
+
+def print_verify(results, elapsed):
+    total = 0
+    for index, entry, crc, status, seconds in results:
+        total += entry.data_size
+        crc_text = f"0x{crc:08x}" if crc is not None else "-" * 10
+        rate = f"{entry.data_size / seconds / 1e6:.1f} MB/s" if seconds else "-"
+        expected = f"0x{entry.data_crc:08x}" if entry.has_crc else "-" * 10
+        print(f"[{index:2d}] {status:9s} crc={crc_text} expected={expected} "
+              f"data={entry.data_size}B {rate}")
+    rate = total / elapsed / 1e6 if elapsed else 0.0
+    print(f"[+] Verified {len(results)} entries, {total} bytes in {elapsed:.2f}s ({rate:.1f} MB/s)")
+
+
+def is_suspicious(entry):
+    """ADS streams and path-traversal names are what the CVE-style archives carry."""
+    return bool(entry.stream_raw) or b'..' in entry.name_raw
+
+
+def scan_file(path):
+    """Parse one archive for the directory scanner, return (path, records, error)."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(8) != RAR5_SIGNATURE:
+                return path, [], None
+        with open_archive(path) as (_src, raw):
+            records = [
+                {
+                    'path': path,
+                    'index': index,
+                    'type': entry.type,
+                    'name': entry.name,
+                    'stream_name': entry.stream_name,
+                    'data_offset': entry.data_offset,
+                    'data_size': entry.data_size,
+                    'unpack_size': entry.unpack_size,
+                    'data_crc': entry.data_crc,
+                    'comp_info': entry.comp_info,
+                    'traversal': '..' in entry.stream_name or '..' in entry.name,
+                }
+                for index, entry in enumerate(parse_rar5(raw))
+                if is_suspicious(entry)
+            ]
+        return path, records, None
+    except Exception as e:  # truncated/corrupt archives must not kill the sweep
+        return path, [], f"{type(e).__name__}: {e}"
+
+
+def walk_files(root):
+    """Regular files under root. FIFOs, sockets and device nodes are skipped, open() would block on them."""
+    dirs = [root]
+    while dirs:
+        try:
+            with os.scandir(dirs.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.path)
+                        elif entry.is_file():  # follows symlinks, so a link to a FIFO is skipped too
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError:  # unreadable directory, like os.walk skip it
+            continue
+
+
+def scan_tree(root, out, jobs=None):
+    """Index suspicious entries of every RAR5 under root as JSONL, return (files, hits).
+
+    Paths go to the pool SCAN_BATCH at a time, so a store with millions of
+    files never has them all queued as pending tasks.
+    """
+    files = hits = 0
+    paths = walk_files(root)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while batch := list(itertools.islice(paths, SCAN_BATCH)):
+            for path, records, error in pool.map(scan_file, batch, chunksize=32):
+                files += 1
+                if error:
+                    print(f"[-] {path}: {error}", file=sys.stderr)
+                for record in records:
+                    out.write(json.dumps(record) + "\n")
+                hits += len(records)
+    return files, hits
+
+
+def print_entries(path, volumes, entries):
+    type_names = {1: 'MAIN', 2: 'FILE', 3: 'SERVICE', 4: 'CRYPT', 5: 'END'}
+    size = sum(len(raw) for _src, raw in volumes)
+    parts = f", {len(volumes)} volumes" if len(volumes) > 1 else ""
+    print(f"[+] {path} ({size} bytes{parts})\n")
+    count = 0
+    for count, entry in enumerate(entries, 1):
+        index = count - 1
         tn = type_names.get(entry.type, f"UNK({entry.type})")
         line = ( # Pwetty format
             f"[{index:2d}] {tn:8s} name={entry.name!r} "
             f"data={entry.data_size}B unpack={entry.unpack_size}B "
             f"crc=0x{entry.data_crc:08x} comp=0x{entry.comp_info:x}"
         )
-        if entry.stream_name:
+        if entry.stream_raw:
             line += f" stream={entry.stream_name!r}"
+        if len(entry.segments) > 1 or entry.flags & SPLIT_AFTER:
+            first, last = entry.segments[0][0], entry.segments[-1][0]
+            line += f" volumes={first + 1}-{last + 1}"
+            if entry.flags & SPLIT_AFTER:
+                line += " (incomplete)"
         print(line)
+    print(f"\n[+] {count} entries")
 
 
 def build_parser():
     parser = argparse.ArgumentParser()
-    parser.add_argument('input', help="Path to the RAR5 archive containing ADS entries")
+    parser.add_argument('input', help="Path to the RAR5 archive containing ADS entries (directory with --scan)")
     parser.add_argument('-l', '--list', action='store_true', help="List all headers and exit")
     parser.add_argument('-e', '--entry', type=int, default=None, help="Entry index to extract (default: first STM)")
-    parser.add_argument('-o', '--output', default=None, help="Output RAR5 path (default: <filename>.rar)")
+    parser.add_argument('-o', '--output', default=None, help="Output RAR5 path (default: <filename>.rar), or output directory with --all")
+    parser.add_argument('-a', '--all', action='store_true', help="Extract every FILE/STM entry with data into its own RAR5")
+    parser.add_argument('-s', '--scan', action='store_true', help="Recursively scan a directory and emit JSONL for ADS/traversal entries (-o for output file)")
+    parser.add_argument('-v', '--verify', action='store_true', help="CRC32-check data areas (all, or -e N) and exit")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and don't write the cached header index")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Worker count for --all/--scan/--verify (default: CPU based)")
     return parser
 
 
@@ -211,28 +828,69 @@ def main():
     parser = build_parser()
     args = parser.parse_args()
 
-    with open(args.input, 'rb') as f:
-        raw = f.read()
-
-    entries = list(parse_rar5(raw))
-
-    if args.list:
-        print_entries(args.input, raw, entries)
+    if args.scan:
+        if not os.path.isdir(args.input):
+            parser.error(f"{args.input} is not a directory")
+        if args.output:
+            with open(args.output, 'w') as out:
+                files, hits = scan_tree(args.input, out, args.jobs)
+        else:
+            files, hits = scan_tree(args.input, sys.stdout, args.jobs)
+        print(f"[+] Scanned {files} files, {hits} suspicious entries", file=sys.stderr)
         return
 
-    target = select_target(parser, entries, args.entry)
-    filename = default_filename(target)
-    out_rar = args.output or f"{filename}.rar"
-    out = build_single_file_rar(raw, target, filename)
-
-    with open(out_rar, 'wb') as f:
-        f.write(out)
+    with open_volumes(args.input) as volumes:
+        entries = iter_entries(args.input, volumes, use_cache=not args.no_cache)
+
+        if args.list:
+            print_entries(args.input, volumes, entries)
+            return
+
+        if args.verify:
+            if args.entry is not None:
+                targets = [(args.entry, select_target(parser, entries, args.entry))]
+            else:
+                targets = [(index, entry) for index, entry in enumerate(entries) if entry.data_size > 0]
+            start = time.perf_counter()
+            results = verify_entries(volumes, targets, args.jobs)
+            print_verify(results, time.perf_counter() - start)
+            if any(status in ('BAD', 'TRUNCATED') for _, _, _, status, _ in results):
+                sys.exit(1)
+            return
+
+        if args.all:
+            written = extract_all(volumes, entries, args.output or '.', args.jobs)
+            if not written:
+                parser.error("No FILE/STM entries with data found. Use -l to inspect.")
+            failed = 0
+            for index, entry, out_rar, out_size, error in written:
+                label = entry.stream_name or entry.name
+                if error:
+                    failed += 1
+                    print(f"[-] [{index:2d}] {label!r}: {error}", file=sys.stderr)
+                else:
+                    print(f"[+] [{index:2d}] {label!r} -> {out_rar} ({out_size} bytes)")
+            print(f"[+] Created {len(written) - failed} archives")
+            if failed:
+                sys.exit(1)
+            return
+
+        target = select_target(parser, entries, args.entry)
+        filename = default_filename(target)
+        out_rar = args.output or f"{filename}.rar"
+        try:
+            check_segments(volumes, target)
+        except ValueError as e:
+            parser.error(f"Can't carve {target.stream_name or target.name!r}: {e}")
+
+        with open(out_rar, 'wb') as f:
+            out_size = write_single_file_rar(volumes, target, filename, f)
 
     print(f"[+] Extracted entry: {target.name!r} "
           f"({target.data_size}B -> {target.unpack_size}B)")
     if target.stream_name:
         print(f"    Stream: {target.stream_name}")
-    print(f"[+] Created {out_rar} ({len(out)} bytes)")
+    print(f"[+] Created {out_rar} ({out_size} bytes)")
     print(f"    Extract with: unrar x {out_rar}")
 
 
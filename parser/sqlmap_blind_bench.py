@@ -0,0 +1,188 @@
+import argparse
+import os
+import random
+import shutil
+import struct
+import time
+import timeit
+from collections import defaultdict
+from urllib.parse import quote
+
+import sqlmap_blind_parser
+from sqlmap_blind_parser import (ProbeMatcher, extract_frames, extract_responses, extract_searches, native_frames,
+                                 resolve_chars)
+
+QUERY = "(SELECT IFNULL(CAST(password AS NCHAR),0x20) FROM users ORDER BY id LIMIT {},1)"
+
+
+def synthetic_probes(count, streams, seed=0):
+    """sqlmap-style ORD(MID()) probes spread round-robin over keep-alive streams.
+
+    Returns (stream_requests, responses) as produced by extract_frames.
+    """
+    rng = random.Random(seed)
+    stream_requests = defaultdict(list)
+    responses = []
+    frame = 0
+    row = 0
+    while len(responses) < count:
+        for pos, value in enumerate(rng.randrange(32, 127) for _ in range(32)):
+            lower, upper = 0, 127
+            while upper - lower > 1 and len(responses) < count:
+                mid = (lower + upper) // 2
+                stream = len(responses) % streams
+                uri = f"/?id=1' OR ORD(MID({QUERY.format(row)},{pos + 1},1))>{mid}-- x"
+                frame += 1
+                stream_requests[stream].append((frame, uri, frame * 0.01))
+                frame += 1
+                responses.append((frame, stream, "TRUE" if value > mid else "FALSE", frame * 0.01))
+                if value > mid:
+                    lower = mid
+                else:
+                    upper = mid
+        row += 1
+    return stream_requests, responses
+
+
+def linear_responses(stream_requests, responses):
+    """The previous O(responses x requests per stream) matcher, kept as the baseline"""
+    matched = {}
+    for response_frame, stream, result, timestamp in responses:
+        best = None
+        for request_frame, _, _ in stream_requests.get(stream, []):
+            if request_frame < response_frame and (best is None or request_frame > best):
+                best = request_frame
+        if best:
+            entry = matched.setdefault((stream, best), [None, timestamp])
+            if result:
+                entry[0] = result
+    rows = []
+    for stream, requests in stream_requests.items():
+        for frame, text, sent in requests:
+            if (stream, frame) in matched:
+                result, responded = matched[(stream, frame)]
+                rows.append((text, result, responded - sent))
+    return rows
+
+
+def check_time_probes(secret="root@localhost", delay=5):
+    """Decode MySQL SLEEP(n-(IF(cond,0,n))) probes whose latency is known, and
+    check the characters come back. The response is slow when cond holds."""
+    rows = []
+    for pos, value in enumerate(map(ord, secret), 1):
+        lower, upper = 0, 127
+        while upper - lower > 1:
+            mid = (lower + upper) // 2
+            text = f"/?id=1 AND SLEEP({delay}-(IF(ORD(MID((SELECT user()),{pos},1))>{mid},0,{delay})))-- x"
+            rows.append((text, None, delay + 0.1 if value > mid else 0.01))
+            if value > mid:
+                lower = mid
+            else:
+                upper = mid
+    queries = resolve_chars(extract_searches(rows, ProbeMatcher(threshold=delay - 1)))
+    decoded = "".join(queries["(SELECT user())"][pos] for pos in sorted(queries["(SELECT user())"]))
+    assert decoded == secret, f"time-based probes decoded to {decoded!r}, expected {secret!r}"
+
+
+def noise(count, seed=0):
+    """Ordinary requests a mixed capture is mostly made of, none of them probes"""
+    rng = random.Random(seed)
+    paths = ["/index.php", "/static/app.js", "/api/items", "/search.php", "/img/logo.png"]
+    return [(f"{rng.choice(paths)}?page={rng.randrange(100)}&sort=name&q=order+by+date", None, None)
+            for _ in range(count)]
+
+
+def write_pcap(f, stream_requests, responses):
+    """Ethernet/IPv4 libpcap capture of the probes, one segment per request and response"""
+    rows = [(frame, stream, True, uri) for stream, requests in stream_requests.items() for frame, uri, _ in requests]
+    rows += [(frame, stream, False, result) for frame, stream, result, _ in responses]
+    rows.sort()
+    seqs = defaultdict(lambda: 1000)
+    f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+    for frame, stream, is_request, value in rows:
+        if is_request:
+            path, _, query = value.partition('?')
+            data = f"GET {path}?{quote(query, safe='=&')} HTTP/1.1\r\nHost: target\r\n\r\n".encode()
+        else:
+            body = "User exists in the database" if value == "TRUE" else "User MISSING from the database"
+            data = f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode()
+        client, server = (b'\x0a\x00\x00\x01', 40000 + stream), (b'\x0a\x00\x00\x02', 80)
+        (src, sport), (dst, dport) = (client, server) if is_request else (server, client)
+        seq = seqs[(stream, is_request)]
+        seqs[(stream, is_request)] = seq + len(data)
+        tcp = struct.pack('>HHIIBBHHH', sport, dport, seq, 1, 5 << 4, 0x18, 65535, 0, 0)
+        ip = struct.pack('>BBHHHBBH4s4s', 0x45, 0, 40 + len(data), 0, 0, 64, 6, 0, src, dst)
+        packet = b'\x00' * 12 + b'\x08\x00' + ip + tcp + data
+        f.write(struct.pack('<IIII', 1_700_000_000 + frame // 1000, frame % 1000 * 1000, len(packet), len(packet)))
+        f.write(packet)
+
+
+def bench_capture(path):
+    """Throughput of the native reader, and of the tshark pass when tshark is installed"""
+    size = os.path.getsize(path)
+    results = {}
+    readers = [('native', native_frames)]
+    if shutil.which('tshark'):
+        sqlmap_blind_parser.PCAP = path
+        readers.append(('tshark', lambda _path: extract_frames()))
+    for name, reader in readers:
+        start = time.perf_counter()
+        stream_requests, responses = reader(path)
+        elapsed = time.perf_counter() - start
+        results[f'{name}_read_s'] = elapsed
+        results[f'{name}_mb_per_s'] = size / 1e6 / elapsed
+        results[f'{name}_matched'] = len(extract_responses(stream_requests, responses))
+    return results
+
+
+def best(fn, number=1, repeat=3):
+    """Fastest of `repeat` timings of fn, per call. Matching stages run once per
+    repeat by default since the linear baseline alone takes tens of seconds."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks for the sqlmap_blind_parser matching stages")
+    parser.add_argument('-n', '--probes', type=int, default=100_000, help="Request/response pairs (default: 100000)")
+    parser.add_argument('--streams', type=int, default=100, help="TCP streams the probes are spread over")
+    parser.add_argument('--skip-linear', action='store_true', help="Don't time the old linear matcher")
+    parser.add_argument('-g', '--generate', default=None, metavar='OUT', help="Write the probes as a pcap and exit")
+    parser.add_argument('-i', '--input', default=None, help="Time reading this capture natively (and with tshark if installed)")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    start = time.perf_counter()
+    stream_requests, responses = synthetic_probes(args.probes, args.streams)
+    print(f"[+] {len(responses):,} probes over {args.streams} streams "
+          f"built in {time.perf_counter() - start:.2f}s")
+
+    if args.generate:
+        with open(args.generate, 'wb') as f:
+            write_pcap(f, stream_requests, responses)
+            print(f"[+] Wrote {args.generate}: {f.tell():,} bytes")
+        return
+
+    check_time_probes()
+    matched = extract_responses(stream_requests, responses)
+    results = {'bisect_match_s': best(lambda: extract_responses(stream_requests, responses))}
+    if not args.skip_linear:
+        assert linear_responses(stream_requests, responses) == matched
+        results['linear_match_s'] = best(lambda: linear_responses(stream_requests, responses), repeat=1)
+        results['match_speedup_x'] = results['linear_match_s'] / results['bisect_match_s']
+    results['searches_s'] = best(lambda: extract_searches(matched))
+    mixed = noise(len(matched))
+    results['prefilter_reject_s'] = best(lambda: extract_searches(mixed, ProbeMatcher()))
+    searches = extract_searches(matched)
+    results['resolve_s'] = best(lambda: resolve_chars(searches))
+    if args.input:
+        results.update(bench_capture(args.input))
+
+    for key, value in results.items():
+        print(f"{key:20s} {value:,}" if isinstance(value, int) else f"{key:20s} {value:,.4f}")
+
+
+if __name__ == '__main__':
+    main()
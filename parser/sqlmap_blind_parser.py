@@ -1,136 +1,676 @@
-import itertools
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import pickle
+import shutil
+import struct
 import subprocess
 import sys
-import threading
+import tempfile
 import time
+from array import array
+from bisect import bisect_left
 from collections import defaultdict
-from urllib.parse import unquote
+from urllib.parse import unquote, unquote_plus
 import re
 
 PCAP = ""
-NOT_ORD_RE = re.compile(r"OR NOT ORD\(MID\((\(.+?\)),(\d+),1\)\)>(\d+)--", re.I)
-ORD_RE = re.compile(r"OR ORD\(MID\((\(.+?\)),(\d+),1\)\)>(\d+)--", re.I)
+# ORD(MID(q,n,1))>x, ASCII(SUBSTRING(q,n,1))>x, UNICODE(SUBSTR(q,n,1))>x, ASCII(SUBSTRING(q::text FROM n FOR 1))>x, ...
+CHAR_COMPARISON = (r"(?:ORD|ASCII|UNICODE)\((?:MID|SUBSTRING|SUBSTRC|SUBSTR)\((?P<query>\(.+?\))(?:::text)?"
+                   r"(?:,(?P<pos>\d+),1|\s+FROM\s+(?P<from>\d+)\s+FOR\s+1)\)\)>(?P<num>\d+)")
+MARKERS = {
+    "exists in the database": "TRUE",
+    "MISSING from the database": "FALSE",
+}
+HEX_RE = re.compile(r"[0-9a-fA-F:,]+")
 
+MARKER_BYTES = {marker.encode(): result for marker, result in MARKERS.items()}
+MARKER_TAIL = max(map(len, MARKER_BYTES)) - 1
+REQUEST_METHODS = (b"GET ", b"POST ", b"HEAD ", b"PUT ", b"DELETE ", b"OPTIONS ")
+MAX_REQUEST = 1 << 16
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_SHB = 0x0A0D0D0A
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101, 228, 229)  # raw IP, IPv4, IPv6
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+TCP_SYN = 0x02
+FOLLOW_INTERVAL = 0.5
+CACHE_VERSION = 1
+HASH_CHUNK = 8 << 20
+RESULT_CODES = {None: -1, "FALSE": 0, "TRUE": 1}
 
-def _spinner(stop_event, msg):
-    chars = itertools.cycle(r"/-\|")
-    while not stop_event.is_set():
-        sys.stdout.write(f"\r  {msg} {next(chars)}   ")
+
+class Progress:
+    """Single status line with the frame the reader has reached, redrawn at most every 0.1s"""
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.frame = 0
+        self.rows = 0
+        self.last = 0.0
+
+    def update(self, frame):
+        self.frame = frame
+        self.rows += 1
+        now = time.monotonic()
+        if now - self.last >= 0.1:
+            self.last = now
+            sys.stdout.write(f"\r  {self.msg} frame {self.frame:,} ({self.rows:,} matched)   ")
+            sys.stdout.flush()
+
+    def close(self):
+        sys.stdout.write(f"\r  {self.msg} done, {self.frame:,} frames ({self.rows:,} matched).\n")
         sys.stdout.flush()
-        time.sleep(0.1)
-    sys.stdout.write(f"\r  {msg} done.\n")
-    sys.stdout.flush()
 
 
-def run_tshark(*args, progress_msg=None):
+def run_tshark(*args):
+    """Run tshark and yield its output lines as they are produced"""
     cmd = ["tshark", "-r", PCAP] + list(args)
-    stop = threading.Event()
-    if progress_msg:
-        t = threading.Thread(target=_spinner, args=(stop, progress_msg), daemon=True)
-        t.start()
-    try:
-        resp = subprocess.run(cmd, capture_output=True, text=True)
-    finally:
-        if progress_msg:
-            stop.set()
-            t.join()
-    if resp.returncode != 0 and resp.stderr:
-        print(resp.stderr, file=sys.stderr)
-        sys.exit(1)
-    return resp.stdout
-
-
-def parse_requests():
-    """Extract HTTP requests: stream -> [(frame, uri)]"""
-    out = run_tshark(
-        "-Y", "http.request.method==GET",
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err, text=True)
+        try:
+            yield from proc.stdout
+        except GeneratorExit:
+            proc.kill()  # consumer stopped early
+            raise
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            err.seek(0)
+            stderr = err.read().decode(errors="replace")
+            if stderr:
+                print(stderr, file=sys.stderr)
+                sys.exit(1)
+
+
+def display_filter(timing=False):
+    """GET/POST requests plus any frame carrying a TRUE/FALSE marker, as one tshark filter.
+
+    With timing every response is kept, time-based probes are judged by latency.
+    """
+    clauses = ["http.request.method==GET", "http.request.method==POST"]
+    if timing:
+        clauses.append("http.response")
+    for marker in MARKERS:
+        # frame contains sees single segments, http.file_data the reassembled body
+        clauses += [f'frame contains "{marker}"', f'http.file_data contains "{marker}"']
+    return " || ".join(clauses)
+
+
+def field_text(value):
+    """newer tshark prints http.file_data as hex bytes"""
+    if HEX_RE.fullmatch(value):
+        try:
+            return bytes.fromhex(value.replace(":", "").replace(",", "")).decode("latin-1")
+        except ValueError:
+            pass
+    return value
+
+
+def classify(body):
+    """TRUE/FALSE for a response body, None when it carries neither marker"""
+    body = field_text(body)
+    for marker, result in MARKERS.items():
+        if marker in body:
+            return result
+    return None
+
+
+def request_text(uri, body=""):
+    """What the matchers search: the decoded URI, plus the form body of a POST"""
+    text = unquote(uri)
+    if body:
+        text += "\n" + unquote_plus(body)
+    return text
+
+
+def tshark_rows(live=False, timing=False):
+    """Single tshark pass, yielding ("request", frame, stream, text, time) and
+    ("response", frame, stream, result, time) rows as tshark prints them"""
+    lines = run_tshark(
+        *(["-l"] if live else []),
+        "-Y", display_filter(timing),
         "-T", "fields", "-E", "separator=\t",
-        "-e", "frame.number", "-e", "tcp.stream", "-e", "http.request.uri",
-        progress_msg="[1/3] Extracting HTTP requests"
+        "-e", "frame.number", "-e", "tcp.stream", "-e", "frame.time_epoch",
+        "-e", "http.request.method", "-e", "http.request.uri", "-e", "http.file_data",
     )
-    stream_requests = defaultdict(list)
-    for line in out.strip().split("\n"):
-        if not line: continue
-        
-        parts = line.split("\t", 2)
-        if len(parts) < 3: continue
-        
+    for line in lines:
+        parts = line.rstrip("\r\n").split("\t", 5)
+        if len(parts) < 5: continue
+
         try:
             frame = int(parts[0])
             stream = int(parts[1])
-            uri = unquote(parts[2].strip()) if parts[2].strip() else ""
-        except (ValueError, IndexError):
+        except ValueError:
             continue
-        
-        stream_requests[stream].append((frame, uri))
+        try:
+            timestamp = float(parts[2])
+        except ValueError:
+            timestamp = None
+        body = parts[5] if len(parts) > 5 else ""
 
-    return stream_requests
+        method, uri = parts[3].strip(), parts[4].strip()
+        if method:
+            if method == "GET":
+                yield "request", frame, stream, request_text(uri), timestamp
+            elif method == "POST":
+                yield "request", frame, stream, request_text(uri, field_text(body)), timestamp
+            continue
 
+        result = classify(body)
+        if result or timing:
+            yield "response", frame, stream, result, timestamp
 
-def extract_responses(stream_requests):
-    """Run tshark for TRUE/FALSE packets, match to requests. Returns [(uri, result)]"""
-    response_true = run_tshark(
-        "-Y", 'frame contains "exists in the database"',
-        "-T", "fields", "-E", "separator=\t",
-        "-e", "frame.number", "-e", "tcp.stream",
-        progress_msg="[2/3] Extracting TRUE responses"
-    )
-    response_false = run_tshark(
-        "-Y", 'frame contains "MISSING from the database"',
-        "-T", "fields", "-E", "separator=\t",
-        "-e", "frame.number", "-e", "tcp.stream",
-        progress_msg="[3/3] Extracting FALSE responses"
-    )
 
-    responses = {}
-    for response, result in [(response_true, "TRUE"), (response_false, "FALSE")]:
-        for line in response.strip().split("\n"):
-            if not line: continue
+def collect(rows, progress):
+    """Returns (stream -> [(frame, text, time)], [(frame, stream, result, time)])"""
+    stream_requests = defaultdict(list)
+    responses = []
+    for kind, frame, stream, value, timestamp in rows:
+        progress.update(frame)
+        if kind == "request":
+            stream_requests[stream].append((frame, value, timestamp))
+        else:
+            responses.append((frame, stream, value, timestamp))
+    progress.close()
+    return stream_requests, responses
+
+
+def extract_frames(timing=False):
+    return collect(tshark_rows(timing=timing), Progress("Extracting HTTP requests and responses"))
+
+
+class Cursor:
+    """Where reading a capture stopped, so a file that is still growing can be resumed"""
+
+    def __init__(self):
+        self.reader = None
+        self.offset = 0
+        self.frame = 0
+        self.endian = "<"
+        self.scale = 1e-6
+        self.linktype = None
+        self.interfaces = []
+
+
+def iter_pcap(raw, cursor):
+    """Classic libpcap records: (frame, timestamp, linktype, packet)"""
+    if cursor.offset == 0:
+        if len(raw) < 24:
+            return
+        cursor.endian, cursor.scale = PCAP_MAGIC[bytes(raw[:4])]
+        cursor.linktype = struct.unpack_from(cursor.endian + "I", raw, 20)[0] & 0xFFFF
+        cursor.offset = 24
+    record = struct.Struct(cursor.endian + "IIII")
+    offset = cursor.offset
+    while offset + record.size <= len(raw):
+        sec, frac, caplen, _ = record.unpack_from(raw, offset)
+        start = offset + record.size
+        if start + caplen > len(raw):
+            break  # last record not fully written yet
+        offset = cursor.offset = start + caplen
+        cursor.frame += 1
+        yield cursor.frame, sec + frac * cursor.scale, cursor.linktype, raw[start:offset]
+
+
+def if_tsresol(raw, endian, offset, end):
+    """Timestamp unit from an Interface Description Block's options, default microseconds"""
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(endian + "HH", raw, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = raw[offset + 4]
+            return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+        offset += 4 + (length + 3) // 4 * 4
+    return 1e-6
+
 
-            parts = line.split("\t")
-            if len(parts) < 2: continue
-            
+def iter_pcapng(raw, cursor):
+    """pcapng Enhanced/Simple/obsolete Packet Blocks: (frame, timestamp, linktype, packet)"""
+    while cursor.offset + 12 <= len(raw):
+        offset = cursor.offset
+        btype = struct.unpack_from(cursor.endian + "I", raw, offset)[0]
+        if btype == PCAPNG_SHB:  # palindromic, readable before the byte order is known
+            cursor.endian = "<" if raw[offset + 8:offset + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            cursor.interfaces = []
+        endian = cursor.endian
+        blen = struct.unpack_from(endian + "I", raw, offset + 4)[0]
+        if blen < 12 or offset + blen > len(raw):
+            break  # last block not fully written yet
+        cursor.offset += blen
+        body = offset + 8
+        if btype == 1:
+            linktype = struct.unpack_from(endian + "H", raw, body)[0]
+            cursor.interfaces.append((linktype, if_tsresol(raw, endian, body + 8, offset + blen - 4)))
+        elif btype in (2, 6):
+            if btype == 6:
+                iface, high, low, caplen = struct.unpack_from(endian + "IIII", raw, body)
+            else:
+                iface, _, high, low, caplen = struct.unpack_from(endian + "HHIII", raw, body)
+            cursor.frame += 1
+            linktype, scale = cursor.interfaces[iface]
+            yield cursor.frame, ((high << 32) | low) * scale, linktype, raw[body + 20:body + 20 + caplen]
+        elif btype == 3:
+            caplen = min(struct.unpack_from(endian + "I", raw, body)[0], blen - 16)
+            cursor.frame += 1
+            yield cursor.frame, 0.0, cursor.interfaces[0][0], raw[body + 4:body + 4 + caplen]
+
+
+def iter_packets(raw, cursor=None):
+    """Packets from cursor's position on, picking the format from the magic on first use"""
+    cursor = cursor or Cursor()
+    if cursor.reader is None:
+        if len(raw) < 4:
+            return iter(())
+        if bytes(raw[:4]) in PCAP_MAGIC:
+            cursor.reader = iter_pcap
+        elif struct.unpack_from("<I", raw)[0] == PCAPNG_SHB:
+            cursor.reader = iter_pcapng
+        else:
+            sys.exit("Not a pcap or pcapng file")
+    return cursor.reader(raw, cursor)
+
+
+def tcp_segment(linktype, pkt):
+    """(src, sport, dst, dport, seq, flags, payload) of a TCP packet, None for anything else"""
+    try:
+        if linktype == LINKTYPE_ETHERNET:
+            offset, ethertype = 14, pkt[12] << 8 | pkt[13]
+            while ethertype in (0x8100, 0x88A8):  # VLAN tags
+                ethertype = pkt[offset + 2] << 8 | pkt[offset + 3]
+                offset += 4
+        elif linktype == LINKTYPE_LINUX_SLL:
+            offset, ethertype = 16, pkt[14] << 8 | pkt[15]
+        elif linktype == LINKTYPE_LINUX_SLL2:
+            offset, ethertype = 20, pkt[0] << 8 | pkt[1]
+        elif linktype == LINKTYPE_NULL:
+            family = pkt[0] or pkt[3]  # host byte order of the capturing machine
+            offset, ethertype = 4, {2: 0x0800, 24: 0x86DD, 28: 0x86DD, 30: 0x86DD}.get(family)
+        elif linktype in LINKTYPE_RAW:
+            offset, ethertype = 0, {4: 0x0800, 6: 0x86DD}.get(pkt[0] >> 4)
+        else:
+            return None
+
+        if ethertype == 0x0800:
+            if pkt[offset + 9] != 6 or struct.unpack_from(">H", pkt, offset + 6)[0] & 0x3FFF:
+                return None  # not TCP, or a fragment
+            end = min(len(pkt), offset + struct.unpack_from(">H", pkt, offset + 2)[0])
+            src, dst = pkt[offset + 12:offset + 16], pkt[offset + 16:offset + 20]
+            offset += (pkt[offset] & 0x0F) * 4
+        elif ethertype == 0x86DD:
+            next_header = pkt[offset + 6]
+            end = min(len(pkt), offset + 40 + struct.unpack_from(">H", pkt, offset + 4)[0])
+            src, dst = pkt[offset + 8:offset + 24], pkt[offset + 24:offset + 40]
+            offset += 40
+            while next_header in (0, 43, 60):  # hop-by-hop, routing, destination options
+                next_header = pkt[offset]
+                offset += (pkt[offset + 1] + 1) * 8
+            if next_header != 6:
+                return None
+        else:
+            return None
+
+        sport, dport, seq = struct.unpack_from(">HHI", pkt, offset)
+        flags = pkt[offset + 13]
+        return src, sport, dst, dport, seq, flags, pkt[offset + (pkt[offset + 12] >> 4) * 4:end]
+    except (IndexError, struct.error):
+        return None
+
+
+class TcpTracker:
+    """Numbers streams in order of first appearance, like tshark's tcp.stream, and
+    trims bytes a direction has already delivered so retransmits are not seen twice"""
+
+    def __init__(self):
+        self.streams = {}
+        self.next_seq = {}
+
+    def segment(self, src, sport, dst, dport, seq, flags, payload):
+        """(stream, direction, new payload bytes)"""
+        a, b = (src, sport), (dst, dport)
+        stream = self.streams.setdefault((a, b) if a <= b else (b, a), len(self.streams))
+        direction = (stream, a)
+        start = (seq + 1) & 0xFFFFFFFF if flags & TCP_SYN else seq
+        expected = self.next_seq.get(direction)
+        if expected is not None:
+            behind = (expected - start) & 0xFFFFFFFF
+            if behind and behind < 1 << 31:
+                if behind >= len(payload):
+                    return stream, direction, b""
+                payload, start = payload[behind:], expected
+        self.next_seq[direction] = (start + len(payload)) & 0xFFFFFFFF
+        return stream, direction, payload
+
+
+def content_length(head):
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
             try:
-                response_frame, stream = map(int, parts)
-            except (ValueError, IndexError):
-                continue
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+class HttpTap:
+    """Turns TCP payloads into the rows extract_frames gets from tshark.
+
+    Requests are reported on the frame that completes their header block, or
+    their Content-Length body for a POST; TRUE/FALSE markers are matched per
+    segment like `frame contains`, plus the few bytes carried over from the
+    previous segment so a marker split across two segments is still seen.
+    With timing, the first segment of every response is reported as well.
+    """
+
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.tcp = TcpTracker()
+        self.pending = {}  # direction -> partial request bytes
+        self.tails = {}    # direction -> last bytes of the previous segment
+
+    def packet(self, frame, timestamp, linktype, pkt):
+        """Yield ("request", frame, stream, text, time) and ("response", frame, stream, result, time) rows"""
+        segment = tcp_segment(linktype, pkt)
+        if segment is None:
+            return
+        stream, direction, payload = self.tcp.segment(*segment)
+        if not payload:
+            return
+        payload = bytes(payload)
+
+        buf = self.pending.pop(direction, b"") + payload
+        while buf.startswith(REQUEST_METHODS):
+            end = buf.find(b"\r\n\r\n")
+            length = content_length(buf[:end]) if end != -1 else 0
+            if end == -1 or len(buf) < end + 4 + length:
+                if len(buf) < MAX_REQUEST:
+                    self.pending[direction] = buf
+                break
+            head, body, buf = buf[:end], buf[end + 4:end + 4 + length], buf[end + 4 + length:]
+            method, uri = head.split(b"\r\n", 1)[0].split(b" ")[:2]
+            if method == b"GET":
+                yield "request", frame, stream, request_text(uri.decode("latin-1")), timestamp
+            elif method == b"POST":
+                yield "request", frame, stream, request_text(uri.decode("latin-1"), body.decode("latin-1")), timestamp
+
+        tail = self.tails.get(direction, b"")
+        window = tail + payload
+        for marker, result in MARKER_BYTES.items():
+            if window.find(marker, max(0, len(tail) - len(marker) + 1)) != -1:
+                yield "response", frame, stream, result, timestamp
+                break
+        else:
+            if self.timing and payload.startswith(b"HTTP/"):
+                yield "response", frame, stream, None, timestamp
+        self.tails[direction] = window[-MARKER_TAIL:]
+
+
+def native_rows(path, follow=False, timing=False):
+    """Built-in pcap/pcapng reader, yields the same rows as tshark_rows.
+
+    With follow, keeps polling the file and picks up records appended to it
+    until interrupted.
+    """
+    tap = HttpTap(timing)
+    cursor = Cursor()
+    with open(path, "rb") as f:
+        while True:
+            if os.fstat(f.fileno()).st_size > cursor.offset:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+                    for frame, timestamp, linktype, pkt in iter_packets(raw, cursor):
+                        yield from tap.packet(frame, timestamp, linktype, pkt)
+            if not follow:
+                break
+            time.sleep(FOLLOW_INTERVAL)
+
+
+def native_frames(path, timing=False):
+    return collect(native_rows(path, timing=timing), Progress("Reading capture"))
+
+
+def cache_dir():
+    """$XDG_CACHE_HOME, %LOCALAPPDATA% or ~/.cache, under sqlmap_blind_parser"""
+    base = (os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "sqlmap_blind_parser")
+
+
+def write_atomic(path, data):
+    """Best effort: a read-only cache location just means running uncached"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir(), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
 
-            requests = stream_requests.get(stream, [])
-            best = None
-            for request_frame, uri in requests:
-                if request_frame < response_frame and (best is None or request_frame > best[0]):
-                    best = (request_frame, uri)
-            
-            if best:
-                request_frame, uri = best
-                responses[(stream, request_frame)] = result
+def capture_digest(path):
+    """blake2b of the capture's content, remembered per (path, size, mtime) so reruns skip rehashing"""
+    st = os.stat(path)
+    ident = [st.st_size, st.st_mtime_ns]
+    memo_file = os.path.join(cache_dir(), "digests.json")
+    try:
+        with open(memo_file) as f:
+            memo = json.load(f)
+    except (OSError, ValueError):
+        memo = {}
+    name = os.path.abspath(path)
+    if memo.get(name, [])[:2] == ident:
+        return memo[name][2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    memo[name] = ident + [digest.hexdigest()]
+    write_atomic(memo_file, json.dumps(memo).encode())
+    return memo[name][2]
+
+
+def cache_path(digest, reader, timing):
+    """Capture content plus everything that decides which rows get extracted from it"""
+    filter_set = repr((CACHE_VERSION, reader, display_filter(timing), sorted(MARKERS.items())))
+    name = hashlib.blake2b(f"{digest}\0{filter_set}".encode(), digest_size=16).hexdigest()
+    return os.path.join(cache_dir(), f"{name}.pickle")
+
+
+def to_columns(stream_requests, responses):
+    """Tables as typed arrays, the request texts as one list; None times become NaN"""
+    requests = [(frame, stream, text, sent) for stream, rows in stream_requests.items() for frame, text, sent in rows]
+    nan = float("nan")
+    return {
+        "version": CACHE_VERSION,
+        "request_frame": array("Q", [r[0] for r in requests]),
+        "request_stream": array("Q", [r[1] for r in requests]),
+        "request_text": [r[2] for r in requests],
+        "request_time": array("d", [nan if r[3] is None else r[3] for r in requests]),
+        "response_frame": array("Q", [r[0] for r in responses]),
+        "response_stream": array("Q", [r[1] for r in responses]),
+        "response_result": array("b", [RESULT_CODES[r[2]] for r in responses]),
+        "response_time": array("d", [nan if r[3] is None else r[3] for r in responses]),
+    }
+
+
+def from_columns(columns):
+    if columns["version"] != CACHE_VERSION:
+        raise ValueError("cache version mismatch")
+    results = {code: result for result, code in RESULT_CODES.items()}
+    stream_requests = defaultdict(list)
+    for frame, stream, text, sent in zip(columns["request_frame"], columns["request_stream"],
+                                         columns["request_text"], columns["request_time"]):
+        stream_requests[stream].append((frame, text, None if math.isnan(sent) else sent))
+    responses = [(frame, stream, results[code], None if math.isnan(timestamp) else timestamp)
+                 for frame, stream, code, timestamp in zip(columns["response_frame"], columns["response_stream"],
+                                                           columns["response_result"], columns["response_time"])]
+    return stream_requests, responses
+
+
+def cached_frames(path, reader, timing, extract, use_cache=True):
+    """extract() through the user cache, keyed by the capture's content hash and the filter set.
+
+    A changed capture hashes differently and so never hits an old entry.
+    """
+    if not use_cache:
+        return extract()
+    try:
+        cache_file = cache_path(capture_digest(path), reader, timing)
+    except OSError:
+        return extract()
+
+    try:
+        with open(cache_file, "rb") as f:
+            tables = from_columns(pickle.load(f))
+        print(f"  Loaded extracted frames from cache {cache_file}")
+        return tables
+    except (OSError, EOFError, KeyError, ValueError, TypeError, pickle.UnpicklingError):
+        pass  # missing or corrupt entry: extract again
+
+    tables = extract()
+    write_atomic(cache_file, pickle.dumps(to_columns(*tables), protocol=pickle.HIGHEST_PROTOCOL))
+    return tables
+
+
+def extract_responses(stream_requests, responses):
+    """Match response frames to the request they answer. Returns [(text, result, latency)]"""
+    # per-stream sorted request frames, the answered request is the latest one before the response
+    frames = {stream: sorted(frame for frame, _, _ in requests) for stream, requests in stream_requests.items()}
+    matched = {}  # (stream, request frame) -> [result, first response time]
+    for response_frame, stream, result, timestamp in responses:
+        request_frames = frames.get(stream)
+        if not request_frames:
+            continue
+
+        i = bisect_left(request_frames, response_frame)
+        if i:
+            entry = matched.setdefault((stream, request_frames[i - 1]), [None, timestamp])
+            if result:
+                entry[0] = result
 
     requests_with_resp = []
     for stream, requests in stream_requests.items():
-        for request_frame, uri in requests:
-            response = responses.get((stream, request_frame))
-            if response:
-                requests_with_resp.append((uri, response))
+        for request_frame, text, timestamp in requests:
+            entry = matched.get((stream, request_frame))
+            if entry:
+                result, responded = entry
+                latency = responded - timestamp if None not in (responded, timestamp) else None
+                requests_with_resp.append((text, result, latency))
 
     return requests_with_resp
 
 
-def extract_searches(requests_with_resp):
-    """Parse ORD(MID(...)) from URIs. Returns (query, pos) -> [(num, op)]"""
+class Matcher:
+    """One family of blind-injection probes.
+
+    Every probe of the family contains one of `literals` (upper case), which
+    is checked before the regex runs. `verdict(match, result, latency,
+    threshold)` says whether the probe's `> num` comparison held, or None
+    when the response can't tell.
+    """
+
+    def __init__(self, name, literals, pattern, verdict):
+        self.name = name
+        self.literals = frozenset(literals)
+        self.regex = re.compile(pattern, re.I | re.S)
+        self.verdict = verdict
+
+
+def boolean_verdict(match, result, latency, threshold):
+    """Content based: the TRUE/FALSE page, inverted by a NOT in front of the comparison"""
+    if result is None:
+        return None
+    return (result == "TRUE") != bool(match["not"])
+
+
+def time_verdict(match, result, latency, threshold):
+    """Time based: a slow response means the comparison held. MySQL's
+    SLEEP(n-(IF(cond,0,n))) sleeps n exactly when cond is true, like the
+    CASE WHEN/WAITFOR forms."""
+    if latency is None or threshold is None:
+        return None
+    return latency >= threshold
+
+
+MATCHERS = [
+    # IF(..)>x,0,5), CASE WHEN (..)>x THEN PG_SLEEP(5), IF(..)>x WAITFOR DELAY, heavy RANDOMBLOB queries
+    Matcher("time", ("SLEEP(", "WAITFOR", "RANDOMBLOB(", "BENCHMARK("),
+            CHAR_COMPARISON, time_verdict),
+    # AND/OR [NOT] ORD(MID(..))>x and its ASCII/UNICODE/SUBSTR(ING) dialects
+    Matcher("boolean", ("ORD(", "ASCII(", "UNICODE("),
+            r"\b(?:AND|OR)\s+(?P<not>NOT\s+)?" + CHAR_COMPARISON, boolean_verdict),
+]
+
+
+class ProbeMatcher:
+    """Runs the first matcher whose literal and regex both hit.
+
+    A single scan of the upper-cased text for the union of all literals
+    throws away everything that is not a probe, and picks which matchers'
+    regexes are worth running on the rest.
+    """
+
+    def __init__(self, matchers=MATCHERS, threshold=None):
+        self.matchers = matchers
+        literals = sorted({literal for matcher in matchers for literal in matcher.literals})
+        self.prefilter = re.compile("|".join(map(re.escape, literals)))
+        self.threshold = threshold
+
+    def probe(self, text, result, latency=None):
+        """Returns (query, pos, num, op) or None"""
+        found = set(self.prefilter.findall(text.upper()))
+        if not found:
+            return None
+        for matcher in self.matchers:
+            if found.isdisjoint(matcher.literals):
+                continue
+            m = matcher.regex.search(text)
+            if m is None:
+                continue
+            held = matcher.verdict(m, result, latency, self.threshold)
+            if held is None:
+                return None
+            return m["query"], int(m["pos"] or m["from"]), int(m["num"]), ">" if held else "<="
+        return None
+
+
+def extract_searches(requests_with_resp, matcher=None):
+    """Returns (query, pos) -> [(num, op)]"""
+    matcher = matcher or ProbeMatcher()
     searches = defaultdict(list)
-    for uri, resp in requests_with_resp:
-        m = NOT_ORD_RE.search(uri)
-        if m:
-            q, pos, num = m.group(1), int(m.group(2)), int(m.group(3))
-            searches[(q, pos)].append((num, "<=" if resp == "TRUE" else ">"))
-            continue
-        m = ORD_RE.search(uri)
-        if m:
-            q, pos, num = m.group(1), int(m.group(2)), int(m.group(3))
-            searches[(q, pos)].append((num, ">" if resp == "TRUE" else "<="))
+    for text, result, latency in requests_with_resp:
+        probe = matcher.probe(text, result, latency)
+        if probe:
+            q, pos, num, op = probe
+            searches[(q, pos)].append((num, op))
     return searches
 
 
+def bounds_char(lower, upper):
+    """Character a binary search settled on, None for the 0 terminator"""
+    val = upper if upper >= lower else lower
+    if val == 0:
+        return None
+    return chr(val) if 32 <= val <= 126 else f"[{val}]"
+
+
 def resolve_chars(searches):
     """Convert binary search bounds to characters. Returns query -> {pos: char}"""
     queries = defaultdict(dict)
@@ -141,43 +681,159 @@ def resolve_chars(searches):
                 lower = max(lower, num)
             else:
                 upper = min(upper, num)
-                
-        val = upper if upper >= lower else lower
-        if val == 0:
-            continue
-        if 32 <= val <= 126:
-            queries[query][pos] = chr(val)
-        else:
-            queries[query][pos] = f"[{val}]"
+
+        char = bounds_char(lower, upper)
+        if char:
+            queries[query][pos] = char
 
     return queries
 
 
-def main():
-    stream_requests = parse_requests()
-    requests_with_resp = extract_responses(stream_requests)
+class LiveResolver:
+    """Binary search bounds per (query, pos), updated one comparison at a time.
 
-    total_reqs = sum(len(v) for v in stream_requests.values())
-    print(f"Requests: {total_reqs}, Matched: {len(requests_with_resp)}")
+    Rows arrive in frame order, so a response belongs to the latest request
+    seen on its stream, the same pairing extract_responses makes afterwards.
+    A request stays open until its probe resolves or the next request on
+    the stream: latency comes from the first response row, while the
+    TRUE/FALSE marker may only turn up in a later segment.
+    """
 
-    print("  Parsing injection payloads...", flush=True)
-    searches = extract_searches(requests_with_resp)
-    queries = resolve_chars(searches)
+    def __init__(self, matcher=None):
+        self.matcher = matcher or ProbeMatcher()
+        self.last_request = {}  # stream -> [text, time, answered, first response time]
+        self.bounds = {}        # (query, pos) -> [lower, upper]
+        self.settled = defaultdict(dict)
+        self.requests = 0
+        self.matched = 0
+
+    def row(self, kind, frame, stream, value, timestamp):
+        """Feed one row. Returns (query, pos) when it settles that character"""
+        if kind == "request":
+            self.last_request[stream] = [value, timestamp, False, None]
+            self.requests += 1
+            return None
+
+        request = self.last_request.get(stream)
+        if request is None:
+            return None
+        if not request[2]:
+            self.matched += 1
+            request[2:] = True, timestamp
+        text, sent, _answered, responded = request
+        latency = responded - sent if None not in (responded, sent) else None
+        probe = self.matcher.probe(text, value, latency)
+        if probe is None:
+            return None  # not a probe, or its marker hasn't arrived yet
+        del self.last_request[stream]
 
+        query, pos, num, op = probe
+        bounds = self.bounds.setdefault((query, pos), [0, 127])
+        if op == ">":
+            bounds[0] = max(bounds[0], num)
+        else:
+            bounds[1] = min(bounds[1], num)
+        if bounds[1] - bounds[0] != 1 or pos in self.settled[query]:
+            return None
+
+        char = bounds_char(*bounds)
+        if char is None:
+            return None
+        self.settled[query][pos] = char
+        return query, pos
+
+    def queries(self):
+        """query -> {pos: char} over every search seen so far, like resolve_chars"""
+        queries = defaultdict(dict)
+        for (query, pos), (lower, upper) in self.bounds.items():
+            char = bounds_char(lower, upper)
+            if char:
+                queries[query][pos] = char
+        return queries
+
+
+def shorten(query):
+    return query[:80] + "..." if len(query) > 80 else query
+
+
+def print_leaked(queries):
     print(f"\n=== LEAKED DATA ({len(queries)} queries) ===")
     for query in sorted(queries.keys(), key=lambda q: min(queries[q].keys())):
         positions = queries[query]
         result = "".join(positions[k] for k in sorted(positions))
-        short = query[:80] + "..." if len(query) > 80 else query
-        print(f"\nQuery: {short}")
+        print(f"\nQuery: {shorten(query)}")
         print(f"Data:  {result}")
 
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        PCAP = sys.argv[1]
+def live(rows, matcher):
+    """Print each character as soon as its binary search converges, summary on exit"""
+    resolver = LiveResolver(matcher)
+    ids = {}
+    try:
+        for row in rows:
+            settled = resolver.row(*row)
+            if not settled:
+                continue
+
+            query, pos = settled
+            if query not in ids:
+                ids[query] = len(ids) + 1
+                print(f"\nQuery #{ids[query]}: {shorten(query)}")
+            positions = resolver.settled[query]
+            data = "".join(positions[k] for k in sorted(positions))
+            print(f"  #{ids[query]} pos {pos:>3}: {positions[pos]:5} {data}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rows.close()
+
+    print(f"\nRequests: {resolver.requests}, Matched: {resolver.matched}")
+    print_leaked(resolver.queries())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Recover data leaked by sqlmap boolean-based blind injection from a capture")
+    parser.add_argument("pcap", help="Capture file (pcap or pcapng), '-' to read a live pcap stream from stdin via tshark")
+    parser.add_argument("--native", action="store_true",
+                        help="Use the built-in pcap reader instead of tshark (default when tshark is not installed)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep reading a capture that is still being written, printing characters as they resolve")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't write the cached frame tables")
+    parser.add_argument("--time-threshold", type=float, default=None, metavar="SECONDS",
+                        help="Also decode time-based probes, a response slower than this means the delay ran")
+    return parser
+
+
+def main(native=False, follow=False, threshold=None, use_cache=True):
+    timing = threshold is not None
+    matcher = ProbeMatcher(threshold=threshold)
+    if follow or PCAP == "-":
+        if native:
+            rows = native_rows(PCAP, follow=follow, timing=timing)
+        else:
+            rows = tshark_rows(live=True, timing=timing)
+        return live(rows, matcher)
+
+    if native:
+        stream_requests, responses = cached_frames(PCAP, "native", timing, lambda: native_frames(PCAP, timing), use_cache)
     else:
-        print(f"Usage: python {sys.argv[0]} <pcap file>")
-        exit(1)
-        
-    main()
+        stream_requests, responses = cached_frames(PCAP, "tshark", timing, lambda: extract_frames(timing), use_cache)
+    requests_with_resp = extract_responses(stream_requests, responses)
+
+    total_reqs = sum(len(v) for v in stream_requests.values())
+    print(f"Requests: {total_reqs}, Matched: {len(requests_with_resp)}")
+
+    print("  Parsing injection payloads...", flush=True)
+    searches = extract_searches(requests_with_resp, matcher)
+    queries = resolve_chars(searches)
+    print_leaked(queries)
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    PCAP = args.pcap
+    native = args.native or args.follow or shutil.which("tshark") is None
+    if PCAP == "-" and native:
+        parser.error("reading a pcap stream from stdin needs tshark, use --follow on a file instead")
+    main(native=native, follow=args.follow, threshold=args.time_threshold, use_cache=not args.no_cache)
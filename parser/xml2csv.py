@@ -1,33 +1,601 @@
 import xml.etree.ElementTree as ET
+import argparse
+import bz2
 import csv
+import gzip
+import itertools
+import lzma
+import mmap
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.parsers import expat
 from tqdm import tqdm
-import sys
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
-def xml_to_csv(xml_file, csv_file):
-    context = ET.iterparse(xml_file, events=("start", "end"))
-    context = iter(context)
-    event, root = next(context)  # Get the root element
-    total_records = sum(1 for event, elem in ET.iterparse(xml_file) if elem.tag == "record")
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
-    with open(csv_file, 'w', newline='') as csvfile:
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 10_000
+RECORD_TAG = "record"
+
+
+COMPRESSED = ('.gz', '.xz', '.lzma', '.bz2', '.zst')
+
+
+def compression_of(path):
+    return next((ext for ext in COMPRESSED if path.lower().endswith(ext)), None)
+
+
+def decompressor(raw, ext):
+    if ext == '.gz':
+        return gzip.GzipFile(fileobj=raw)
+    if ext in ('.xz', '.lzma'):
+        return lzma.LZMAFile(raw)
+    if ext == '.bz2':
+        return bz2.BZ2File(raw)
+    if zstandard is None:
+        raise SystemExit("zstandard is required for .zst files: pip install zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+class ThreadedReader:
+    """Decompress in a background thread so inflating overlaps with parsing.
+
+    read() hands out decompressed bytes (possibly fewer than asked for);
+    tell() reports the position in the compressed file, which is what the
+    progress bar is measured against. The codecs release the GIL while
+    they work, so the two threads really do run side by side.
+    """
+
+    def __init__(self, raw, stream, chunk_size=1 << 20, depth=8):
+        self.raw = raw
+        self.stream = stream
+        self.chunks = queue.Queue(depth)
+        self.pending = b''
+        self.error = None
+        self.done = False
+        self.closing = False
+        self.thread = threading.Thread(target=self._pump, args=(chunk_size,), daemon=True)
+        self.thread.start()
+
+    def _pump(self, chunk_size):
+        try:
+            while not self.closing and (chunk := self.stream.read(chunk_size)):
+                self.chunks.put(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.chunks.put(None)
+
+    def read(self, size=-1):
+        if not self.pending:
+            if self.done:
+                return b''
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.done = True
+                if self.error is not None:
+                    raise self.error
+                return b''
+            self.pending = chunk
+        if size < 0 or size >= len(self.pending):
+            data, self.pending = self.pending, b''
+        else:
+            data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+    def tell(self):
+        return self.raw.tell()
+
+    def close(self):
+        self.closing = True
+        while self.thread.is_alive():  # unblock a pump waiting on a full queue
+            try:
+                self.chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.stream.close()
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_input(path):
+    """Binary reader for path, transparently decompressing .gz/.xz/.bz2/.zst in a helper thread."""
+    ext = compression_of(path)
+    raw = open(path, 'rb')
+    if ext is None:
+        return raw
+    return ThreadedReader(raw, decompressor(raw, ext))
+
+
+def open_output(path):
+    """Text writer for CSV output, compressed according to path's extension."""
+    ext = compression_of(path)
+    if ext == '.gz':
+        return gzip.open(path, 'wt', newline='')
+    if ext in ('.xz', '.lzma'):
+        return lzma.open(path, 'wt', newline='')
+    if ext == '.bz2':
+        return bz2.open(path, 'wt', newline='')
+    if ext == '.zst':
+        if zstandard is None:
+            raise SystemExit("zstandard is required for .zst files: pip install zstandard")
+        return zstandard.open(path, 'wt', newline='')
+    return open(path, 'w', newline='')
+
+
+class RecordCollector:
+    """XMLParser target that only keeps the record currently being built.
+
+    Everything outside a record is dropped as it streams past, and a record
+    is handed off as a list of (tag, text) pairs the moment it closes, so
+    memory stays flat no matter how big the document is. Children not in
+    `fields` (when given) have their text ignored rather than collected.
+    """
+
+    def __init__(self, record_tag, fields=None):
+        self.record_tag = record_tag
+        self.fields = fields
+        self.records = []
+        self.row = None
+        self.depth = 0
+        self.text = None
+
+    def start(self, tag, attrib):
+        if self.row is None:
+            if tag == self.record_tag:
+                self.row = []
+                self.depth = 1
+            return
+        self.depth += 1
+        if self.depth == 2:
+            self.text = [] if self.fields is None or tag in self.fields else None
+        elif self.depth == 3 and self.text is not None:
+            # like Element.text, only data before the first grandchild counts
+            self.row.append((self.field_tag, ''.join(self.text)))
+            self.text = None
+        if self.depth == 2:
+            self.field_tag = tag
+
+    def data(self, data):
+        if self.depth == 2 and self.text is not None:
+            self.text.append(data)
+
+    def end(self, tag):
+        if self.row is None:
+            return
+        if self.depth == 2 and self.text is not None:
+            self.row.append((tag, ''.join(self.text)))
+            self.text = None
+        self.depth -= 1
+        if self.depth == 0:
+            self.records.append(self.row)
+            self.row = None
+
+    def close(self):
+        return None
+
+
+def iter_records_etree(source, record_tag, fields=None):
+    collector = RecordCollector(record_tag, fields)
+    parser = ET.XMLParser(target=collector)
+    while chunk := source.read(CHUNK_SIZE):
+        parser.feed(chunk)
+        yield from collector.records
+        collector.records.clear()
+    parser.close()
+    yield from collector.records
+
+
+def iter_records_lxml(source, record_tag, fields=None):
+    # lxml builds every child of the record; fields only filters the pairs afterwards
+    for _event, elem in etree.iterparse(source, events=("end",), tag=record_tag, huge_tree=True):
+        yield [(child.tag, child.text or '') for child in elem
+               if isinstance(child.tag, str) and (fields is None or child.tag in fields)]
+        # drop the record and any already-seen siblings still hanging off the parent
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def iter_records(source, record_tag=RECORD_TAG, engine=None, fields=None):
+    """Yield each <record_tag> element of a binary XML stream as [(tag, text), ...].
+
+    engine is "lxml" or "etree"; by default lxml is used when installed.
+    fields, if given, restricts the pairs to those child tags. The etree
+    engine then doesn't collect other children's text at all; lxml still
+    builds them and drops them with the record.
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+    if engine is None:
+        engine = "lxml" if etree is not None else "etree"
+    if engine == "lxml":
+        return iter_records_lxml(source, record_tag, fields)
+    return iter_records_etree(source, record_tag, fields)
+
+
+def unique_columns(record):
+    """[(column, text)] with a tag repeated inside the record numbered tag, tag_2, tag_3, ..."""
+    seen = {}
+    columns = []
+    for tag, text in record:
+        n = seen[tag] = seen.get(tag, 0) + 1
+        columns.append((tag if n == 1 else f"{tag}_{n}", text))
+    return columns
+
+
+def column_tags(headers):
+    """Child tags the parser has to collect for headers: tag_2 and up need tag itself."""
+    tags = set(headers)
+    for header in headers:
+        tag, _, n = header.rpartition('_')
+        if tag and n.isdigit():
+            tags.add(tag)
+    return tags
+
+
+def sample_headers(xml_file, sample, record_tag=RECORD_TAG, engine=None):
+    """Union of child tags over the first `sample` records, in first-seen order.
+
+    Only the start of the file is parsed.
+    """
+    headers = {}
+    with open_input(xml_file) as source:
+        for record in itertools.islice(iter_records(source, record_tag, engine), sample):
+            for column, _text in unique_columns(record):
+                headers.setdefault(column)
+    return list(headers)
+
+
+def iter_batches(source, record_tag=RECORD_TAG, engine=None, headers=None, progress=None, batch_size=BATCH_SIZE):
+    """Yield (headers, rows) in batches of batch_size records.
+
+    Rows are keyed by tag against headers, so missing children come out empty
+    and unknown ones are dropped instead of shifting columns. A tag repeated
+    within a record fills columns tag, tag_2, ... in document order. Given
+    headers also limit what the parser collects; otherwise the first
+    record's tags are used. progress, if given, is called with source.tell()
+    after each batch.
+    """
+    headers = list(headers) if headers else None
+    rows = []
+    for record in iter_records(source, record_tag, engine, column_tags(headers) if headers else None):
+        values = dict(record)
+        if len(values) != len(record):
+            record = unique_columns(record)
+            values = dict(record)
+        if headers is None:
+            headers = [column for column, _text in record]
+        rows.append([values.get(tag, '') for tag in headers])
+        if len(rows) >= batch_size:
+            yield headers, rows
+            rows = []
+            if progress is not None:
+                progress(source.tell())
+    if rows:
+        yield headers, rows
+
+
+def progress_bar(total_bytes):
+    # Progress follows bytes consumed by the parser, so no pre-count pass is needed
+    return tqdm(total=total_bytes, unit='B', unit_scale=True, desc="Processing records")
+
+
+def xml_to_csv(xml_file, csv_file, engine=None, record_tag=RECORD_TAG, headers=None):
+    total_bytes = os.path.getsize(xml_file)
+
+    with open_input(xml_file) as source, open_output(csv_file) as csvfile:
         csvwriter = csv.writer(csvfile)
 
         headers_written = False
-        with tqdm(total=total_records, desc="Processing records") as pbar:
-            for event, elem in context:
-                if event == "end" and elem.tag == "record":
-                    if not headers_written:
-                        headers = [child.tag for child in elem]
-                        csvwriter.writerow(headers)
-                        headers_written = True
-
-                    row = [child.text for child in elem]
-                    csvwriter.writerow(row)
-
-                    root.clear()
-                    pbar.update(1)
-
-filename = sys.argv[1]
-output = sys.argv[2] if len(sys.argv) > 1 else filename.replace('.xml', '.csv')
-xml_to_csv(xml_file=filename, csv_file=output)
\ No newline at end of file
+        with progress_bar(total_bytes) as pbar:
+            batches = iter_batches(source, record_tag, engine, headers, lambda pos: pbar.update(pos - pbar.n))
+            for headers, rows in batches:
+                if not headers_written:
+                    csvwriter.writerow(headers)
+                    headers_written = True
+                csvwriter.writerows(rows)
+            pbar.update(total_bytes - pbar.n)
+
+
+# Only values that read back the same once typed: no leading zeros or "+",
+# so zip codes, phone numbers and zero-padded IDs stay strings
+CANONICAL_INT = re.compile(r'0|-?[1-9][0-9]*')
+CANONICAL_FLOAT = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def column_type_of(values):
+    """int64 if every value is a canonical integer in range, float64 if every
+    value is a canonical decimal and at least one isn't an integer, else string.
+    All-digit columns never become float64: an ID too big for int64 stays text."""
+    if not values:
+        return pa.string()
+    if all(CANONICAL_INT.fullmatch(value) for value in values):
+        if all(INT64_MIN <= int(value) <= INT64_MAX for value in values):
+            return pa.int64()
+        return pa.string()
+    if all(CANONICAL_FLOAT.fullmatch(value) for value in values):
+        return pa.float64()
+    return pa.string()
+
+
+def infer_schema(headers, rows, infer_types=True):
+    """Arrow schema from the first batch, typed by column_type_of where infer_types."""
+    fields = []
+    for i, name in enumerate(headers):
+        column_type = pa.string()
+        if infer_types:
+            column_type = column_type_of([row[i] for row in rows if i < len(row) and row[i]])
+        fields.append(pa.field(name, column_type))
+    return pa.schema(fields)
+
+
+def batch_table(schema, rows):
+    """Build a typed table from positional rows; short rows are padded with nulls.
+
+    A typed column holding a value that wouldn't read back the same raises ArrowInvalid.
+    """
+    arrays = []
+    for i, field in enumerate(schema):
+        column = [row[i] if i < len(row) else None for row in rows]
+        if field.type == pa.string():
+            arrays.append(pa.array(column, pa.string()))
+            continue
+        canonical = CANONICAL_INT if field.type == pa.int64() else CANONICAL_FLOAT
+        bad = next((value for value in column if value and not canonical.fullmatch(value)), None)
+        if bad is not None:
+            raise pa.ArrowInvalid(f"{bad!r} in {field.type} column {field.name!r}")
+        arrays.append(pa.array([value or None for value in column], pa.string()).cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def open_columnar_writer(out_file, fmt, schema, compression):
+    if fmt == "parquet":
+        return pq.ParquetWriter(out_file, schema, compression=compression or "zstd")
+    options = pa.ipc.IpcWriteOptions(compression=compression or "zstd")
+    return pa.ipc.new_file(out_file, schema, options=options)
+
+
+def xml_to_columnar(xml_file, out_file, fmt="parquet", compression=None, engine=None, infer_types=True,
+                    record_tag=RECORD_TAG, headers=None):
+    """Write records as Parquet or Arrow IPC, one row group/record batch per BATCH_SIZE records.
+
+    Column types are inferred from the first batch; a later value that
+    doesn't fit is an error, rerun with infer_types off to keep strings.
+    """
+    if pa is None:
+        raise SystemExit("pyarrow is required for Parquet/Arrow output: pip install pyarrow")
+    total_bytes = os.path.getsize(xml_file)
+    writer = None
+    try:
+        with open_input(xml_file) as source, progress_bar(total_bytes) as pbar:
+            batches = iter_batches(source, record_tag, engine, headers, lambda pos: pbar.update(pos - pbar.n))
+            for headers, rows in batches:
+                if writer is None:
+                    schema = infer_schema(headers, rows, infer_types)
+                    writer = open_columnar_writer(out_file, fmt, schema, compression)
+                try:
+                    writer.write_table(batch_table(schema, rows))
+                except pa.ArrowInvalid as e:
+                    raise SystemExit(f"Value doesn't match the type inferred from the first batch ({e}); "
+                                     "rerun with --strings") from None
+            pbar.update(total_bytes - pbar.n)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class RangeReader:
+    """Binary file-like view of source[start:end] between the document's own head and tail.
+
+    head is the original bytes up to the first record (XML declaration,
+    namespace declarations, root start tag) and tail closes the root, so a
+    range parses with the same encoding and prefixes as the whole file.
+    """
+
+    def __init__(self, source, start, end, head, tail):
+        source.seek(start)
+        self.source = source
+        self.remaining = end - start
+        self.head = head
+        self.tail = tail
+
+    def read(self, size=-1):
+        if self.head:
+            head, self.head = self.head, b''
+            return head
+        if self.remaining:
+            data = self.source.read(self.remaining if size < 0 else min(size, self.remaining))
+            self.remaining = self.remaining - len(data) if data else 0
+            if data:
+                return data
+        tail, self.tail = self.tail, b''
+        return tail
+
+
+def find_record_start(raw, record_tag, pos):
+    """Offset of the next <record_tag start tag at or after pos, or -1."""
+    needle = b'<' + record_tag.encode()
+    while (pos := raw.find(needle, pos)) != -1:
+        if raw[pos + len(needle):pos + len(needle) + 1] in (b'>', b'/', b' ', b'\t', b'\r', b'\n'):
+            return pos
+        pos += 1
+    return -1
+
+
+def document_frame(head):
+    """(head, tail) to wrap a range of records in: head verbatim, tail the root's end tag.
+
+    Raises SystemExit unless head leaves exactly the root element open, i.e.
+    records are direct children of the root.
+    """
+    opened = []
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = lambda name, attrs: opened.append(parser.CurrentByteIndex)
+    parser.EndElementHandler = lambda name: opened.pop()
+    try:
+        parser.Parse(head, False)
+    except expat.ExpatError as e:
+        raise SystemExit(f"Can't split the input, the XML before the first record is malformed ({e})") from None
+    if len(opened) != 1:
+        raise SystemExit("-j needs records to be direct children of the root element")
+    root_name = re.match(rb'<([^\s/>]+)', head[opened[0]:]).group(1)
+    return head, b'</' + root_name + b'>'
+
+
+def split_ranges(xml_file, parts, record_tag=RECORD_TAG):
+    """Split the records of xml_file into at most `parts` byte ranges, each starting at a record.
+
+    Returns (head, tail, ranges), see document_frame. The last range stops
+    at the root's closing tag. Records must all be direct children of the
+    root: one nested in a container element past the first record would cut
+    the container in two. A "<record" inside a comment or CDATA section would
+    also be taken for a boundary.
+    """
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw:
+        first = find_record_start(raw, record_tag, 0)
+        end = raw.rfind(b'</')
+        if first == -1 or end <= first:
+            return b'', b'', []
+        head, tail = document_frame(raw[:first])
+        starts = [first]
+        for i in range(1, parts):
+            start = find_record_start(raw, record_tag, max(first + (end - first) * i // parts, starts[-1] + 1))
+            if start == -1 or start >= end:
+                break
+            starts.append(start)
+        return head, tail, list(zip(starts, starts[1:] + [end]))
+
+
+def convert_range(xml_file, start, end, head, tail, part_file, record_tag, engine, headers):
+    """Worker: write rows of one byte range to part_file without a header row."""
+    try:
+        with open(xml_file, 'rb') as source, open(part_file, 'w', newline='') as out:
+            csvwriter = csv.writer(out)
+            for _headers, rows in iter_batches(RangeReader(source, start, end, head, tail), record_tag, engine, headers):
+                csvwriter.writerows(rows)
+    except Exception as e:
+        # parser errors (lxml's in particular) don't always pickle back to the parent
+        raise RuntimeError(f"bytes {start}-{end}: {e}") from None
+
+
+def xml_to_csv_parallel(xml_file, csv_file, jobs, engine=None, record_tag=RECORD_TAG, headers=None):
+    """Convert byte ranges in a process pool, then stitch the parts in order under one header row.
+
+    Workers need the columns up front, so without explicit headers they come
+    from the first record.
+    """
+    headers = headers or sample_headers(xml_file, 1, record_tag, engine)
+    head, tail, ranges = split_ranges(xml_file, jobs * 4, record_tag)  # oversplit so a slow range doesn't idle the pool
+    workdir = os.path.dirname(os.path.abspath(csv_file))
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        part_files = [os.path.join(tmp, f"part{i}.csv") for i in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=jobs) as pool, \
+                tqdm(total=os.path.getsize(xml_file), unit='B', unit_scale=True, desc="Processing records") as pbar:
+            futures = {
+                pool.submit(convert_range, xml_file, start, end, head, tail, part_file, record_tag, engine, headers):
+                    end - start
+                for (start, end), part_file in zip(ranges, part_files)
+            }
+            for future in as_completed(futures):
+                future.result()
+                pbar.update(futures[future])
+            pbar.update(pbar.total - pbar.n)
+
+        with open_output(csv_file) as csvfile:
+            if headers:
+                csv.writer(csvfile).writerow(headers)
+            for part_file in part_files:
+                with open(part_file, newline='') as part:
+                    shutil.copyfileobj(part, csvfile, 1 << 20)
+
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+def output_format(output, fmt):
+    if fmt:
+        return fmt
+    output = output or ''
+    if compression_of(output):
+        output = os.path.splitext(output)[0]
+    ext = os.path.splitext(output)[1].lower()
+    if ext == ".feather":
+        return "arrow"
+    return next((name for name, suffix in FORMATS.items() if suffix == ext), "csv")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Convert <record> elements of an XML export into CSV, Parquet or Arrow")
+    parser.add_argument('input', help="XML file, optionally .gz/.xz/.bz2/.zst compressed")
+    parser.add_argument('output', nargs='?', default=None,
+                        help="Output file, CSV may end in .gz/.xz/.bz2/.zst (default: input with the format's extension)")
+    parser.add_argument('-f', '--format', choices=list(FORMATS), default=None,
+                        help="Output format (default: from the output extension, else csv)")
+    parser.add_argument('--compression', default=None, help="Parquet/Arrow codec (default: zstd)")
+    parser.add_argument('--strings', action='store_true', help="Keep every Parquet/Arrow column as string")
+    parser.add_argument('-t', '--record-tag', default=RECORD_TAG, help="Element that holds one row (default: record)")
+    columns = parser.add_mutually_exclusive_group()
+    columns.add_argument('--fields', type=lambda s: s.split(','), default=None,
+                         help="Comma-separated child tags to keep, in column order; others are dropped")
+    columns.add_argument('--sample', type=int, default=None,
+                         help="Columns are the union of child tags over the first N records (default: first record)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="Worker processes; >1 splits the input at record boundaries")
+    parser.add_argument('--engine', choices=['lxml', 'etree'], default=None, help="Parser engine (default: lxml if installed)")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    fmt = output_format(args.output, args.format)
+    output = args.output
+    if output is None:
+        # big.xml.gz -> big.csv.gz or big.parquet, dump.dat -> dump.csv
+        compression = compression_of(args.input) or ''
+        stem = os.path.splitext(args.input[:len(args.input) - len(compression)])[0]
+        output = stem + FORMATS[fmt] + (compression if fmt == "csv" else '')
+    if os.path.abspath(output) == os.path.abspath(args.input) or (
+            os.path.exists(output) and os.path.samefile(output, args.input)):
+        parser.error(f"Output {output} is the input file")
+    headers = args.fields
+    if args.sample:
+        headers = sample_headers(args.input, args.sample, args.record_tag, args.engine)
+    if args.jobs > 1 and compression_of(args.input):
+        parser.error("-j needs an uncompressed input to split")
+    if fmt != "csv":
+        if compression_of(output):
+            parser.error("Parquet/Arrow output is compressed internally, see --compression")
+        if args.jobs > 1:
+            parser.error("-j is only supported for CSV output")
+        xml_to_columnar(args.input, output, fmt, args.compression, engine=args.engine, infer_types=not args.strings,
+                        record_tag=args.record_tag, headers=headers)
+    elif args.jobs > 1:
+        xml_to_csv_parallel(args.input, output, args.jobs, engine=args.engine, record_tag=args.record_tag, headers=headers)
+    else:
+        xml_to_csv(xml_file=args.input, csv_file=output, engine=args.engine, record_tag=args.record_tag, headers=headers)
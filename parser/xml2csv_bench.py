@@ -0,0 +1,65 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from xml2csv import etree, xml_to_csv
+
+
+def write_sample(path, records, fields=8):
+    """Stream a <root> of `records` flat <record> elements to path."""
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0"?>\n<root>\n')
+        for i in range(records):
+            cells = ''.join(f'<field{n}>value {i} &amp; {n}</field{n}>' for n in range(fields))
+            f.write(f'  <record>{cells}</record>\n')
+        f.write('</root>\n')
+
+
+def child(xml_file, engine):
+    """Run one conversion in this process and print "<seconds> <max_rss_mb>"."""
+    import resource
+    csv_file = xml_file + '.csv'
+    sys.stderr = open(os.devnull, 'w')  # silence tqdm
+    start = time.perf_counter()
+    xml_to_csv(xml_file, csv_file, engine=engine)
+    elapsed = time.perf_counter() - start
+    os.remove(csv_file)
+    print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Peak RSS and throughput of xml2csv across input sizes")
+    parser.add_argument('-n', '--records', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Record counts to test (default: 10k 100k 1M)")
+    parser.add_argument('--engine', choices=['lxml', 'etree'], nargs='+',
+                        default=['lxml', 'etree'] if etree is not None else ['etree'])
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'engine':8s} {'records':>10s} {'input MB':>10s} {'seconds':>9s} {'MB/s':>8s} {'max RSS MB':>11s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for records in args.records:
+            xml_file = os.path.join(tmp, f'sample_{records}.xml')
+            write_sample(xml_file, records)
+            size_mb = os.path.getsize(xml_file) / 1e6
+            for engine in args.engine:
+                # fresh process per run so ru_maxrss is this conversion's peak only
+                out = subprocess.run([sys.executable, __file__, '--child', xml_file, engine],
+                                     capture_output=True, text=True, check=True).stdout
+                elapsed, rss = map(float, out.split())
+                print(f"{engine:8s} {records:10d} {size_mb:10.1f} {elapsed:9.2f} {size_mb / elapsed:8.1f} {rss:11.1f}")
+            os.remove(xml_file)
+
+
+if __name__ == '__main__':
+    main()